@@ -1,25 +1,48 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, g, jsonify, request, stream_with_context
 from flask_cors import CORS
 import json
+import os
+import sqlite3
+import time
 from datetime import datetime
 from pathlib import Path
-from servicenow_api import get_incidents
+from servicenow_api import get_client as get_servicenow_client
+from ticket_sync import TicketSync
 
 # ---- Old APIs (Inventory / Discovery / Config Push) ----
 from inventory import (
     load_inventory,
+    inventory_version,
+    find_device,
     add_device_to_inventory,
     delete_device_from_inventory,
+    bulk_inventory,
+    rows_from_csv,
 )
 from discovery_handler import run_discovery_api
-from status_checker import get_device_status
+from status_poller import StatusPoller
 from config_push import push_config
+from command_runner import select_targets, unknown_ips, run_batch, BATCH_CONCURRENCY
+from rollout import start_rollout, get_rollout, subscribe as subscribe_rollouts
+from jobs import job_manager
+from instrumentation import REGISTRY, HTTP_LATENCY, start_profile, stop_profile, current_profile, server_timing
 
 # ---- NOC Dashboard Logic ----
-from utils.health import compute_health_overview, compute_device_health_score
+from utils.health_engine import score_fleet
 from utils.compliance import evaluate_compliance_overview
-from utils.diff import get_before_after_for_device, compute_diff_summary
-from utils.insights import generate_recommendations
+from utils.compliance_engine import ComplianceEngine
+from utils.diff import compute_diff_summary, diff_configs
+from utils.backup_store import BackupStore
+from utils.automation_log import AutomationLog
+from utils.topology import TopologyGraph, discovery_links
+from utils.topology_lod import TopologyLOD, LOD_MODES, iter_chunks
+from utils.insights_engine import InsightsEngine
+from utils.cache import AggregateCache
+from utils.datasource import DataSource
+from utils.timeseries import MetricStore, parse_duration, parse_timestamp
+from utils.alert_store import AlertStore, INDEXED_FIELDS
+from utils.events import EventBus, TOPICS
+from utils.http_cache import ResponseCache, available_encodings
 
 # ---------------------------------
 # App Setup
@@ -31,19 +54,346 @@ CORS(app)
 BASE_DIR = Path(__file__).resolve().parent
 DATA_DIR = BASE_DIR / "data"
 
-# Helper to load JSON
-def load_json(fname: str):
-    with open(DATA_DIR / fname, "r") as f:
-        return json.load(f)
 
-# Load NOC mock data
-DEVICES = load_json("devices.json")
-LINKS = load_json("links.json")
-AUTOMATION = load_json("automation.json")
-BACKUPS = load_json("backups.json")
-COMPLIANCE = load_json("compliance.json")
-ALERTS = load_json("alerts.json")
-TRENDS = load_json("trends.json")
+# Per-route latency histograms; ?profile=1 adds a Server-Timing breakdown.
+# Streamed responses (NDJSON/SSE, config downloads) are timed until the
+# stream closes, but their Server-Timing header only covers the work done
+# before the first byte, since headers go out first.
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+    if request.args.get("profile", "").lower() in ("1", "true", "yes"):
+        g.profile_token = start_profile()
+
+
+def observe_request(start, method, route, status):
+    HTTP_LATENCY.observe(time.perf_counter() - start, method=method, route=route, status=str(status))
+
+
+@app.after_request
+def add_request_timing(resp):
+    g.response_status = resp.status_code
+    if g.get("profile_token") is not None:
+        resp.headers["Server-Timing"] = server_timing(
+            current_profile(), total=time.perf_counter() - g.request_start
+        )
+    if resp.is_streamed:
+        g.timed_on_close = True
+        start, method = g.request_start, request.method
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        resp.call_on_close(lambda: observe_request(start, method, route, resp.status_code))
+    return resp
+
+
+@app.teardown_request
+def record_request_timing(exc):
+    # runs even when the view raised (then no response status was recorded: 500)
+    token = g.pop("profile_token", None)
+    if token is not None:
+        stop_profile(token)
+    if "request_start" in g and not g.get("timed_on_close"):
+        route = request.url_rule.rule if request.url_rule else "unmatched"
+        observe_request(g.request_start, request.method, route, g.get("response_status", 500))
+
+
+# Helpers for endpoints that can run as background jobs
+def wants_async(data=None):
+    flag = request.args.get("async", "").lower() in ("1", "true", "yes")
+    return flag or bool((data or {}).get("async"))
+
+
+def job_accepted(job):
+    return jsonify({
+        "jobId": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "statusUrl": f"/api/jobs/{job.id}",
+    }), 202
+
+# Push channel for dashboard deltas (/api/stream)
+EVENTS = EventBus(max_queue=int(os.getenv("STREAM_MAX_QUEUE", "500")))
+STREAM_HEARTBEAT = float(os.getenv("STREAM_HEARTBEAT", "15"))
+
+# Serialized (and compressed) bodies of the big read endpoints, keyed by data version
+RESPONSE_CACHE = ResponseCache(max_entries=int(os.getenv("RESPONSE_CACHE_SIZE", "256")))
+
+
+def cached_json(key, version, build):
+    """
+    JSON response served from RESPONSE_CACHE with a content-hash ETag:
+    304 when If-None-Match matches, gzip/br when the client accepts it.
+    """
+    cached = RESPONSE_CACHE.get(key, version, build, lambda data: app.json.response(data).get_data())
+
+    if request.if_none_match.contains_weak(cached.etag):
+        response = Response(status=304)
+    else:
+        encoding = max(available_encodings(), key=request.accept_encodings.quality)
+        encoding = encoding if request.accept_encodings.quality(encoding) > 0 else None
+        body = cached.encoded(encoding)
+        response = Response(body, mimetype="application/json")
+        if body is not cached.body:
+            response.headers["Content-Encoding"] = encoding
+
+    response.set_etag(cached.etag, weak=True)
+    response.headers["Vary"] = "Accept-Encoding"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+# ServiceNow incidents, synced incrementally into data/incident_data.json
+TICKET_SYNC = TicketSync(get_servicenow_client)
+TICKET_SYNC.subscribe(lambda changes: EVENTS.publish("tickets", changes))
+
+# Rule checks over raw running-configs (POST /api/compliance/evaluate)
+COMPLIANCE_ENGINE = ComplianceEngine(workers=int(os.getenv("COMPLIANCE_WORKERS", "0")) or None)
+
+# Background reachability poller (started on first /api/status or status stream hit)
+STATUS_POLLER = StatusPoller(load_inventory)
+STATUS_POLLER.subscribe(lambda flipped: EVENTS.publish("status", {"transitions": flipped}))
+
+# NOC mock data files, watched and reloaded when they change on disk
+NOC_FILES = {
+    "devices": "devices.json",
+    "links": "links.json",
+    "automation": "automation.json",
+    "backups": "backups.json",
+    "compliance": "compliance.json",
+    "alerts": "alerts.json",
+    "trends": "trends.json",
+}
+
+NOC_DATA = DataSource(DATA_DIR, NOC_FILES, interval=float(os.getenv("DATA_POLL_INTERVAL", "2")))
+
+# Dashboard aggregates, recomputed only when their datasets change
+NOC_CACHE = AggregateCache()
+NOC_DATA.subscribe(lambda changed: NOC_CACHE.invalidate(*changed))
+
+# Time-series of device/fleet metrics behind /api/trends
+METRICS = MetricStore()
+TREND_METRICS = ["avgHealthScore", "automationSuccessRate", "totalAutomationTasks", "openIncidentsCount"]
+DEVICE_METRICS = ["cpuUsage", "memoryUsage", "healthScore"]
+
+
+def seed_trend_history(trends):
+    """Load the daily history in trends.json into the metric store (once, at startup)."""
+    days = {}
+    for key in ("30d", "7d"):
+        for row in trends.get(key, []):
+            days.setdefault(row["date"], row)
+    for date, row in days.items():
+        ts = parse_timestamp(date)
+        for metric in TREND_METRICS:
+            METRICS.append(metric, row.get(metric), ts)
+
+
+def record_noc_metrics(changed):
+    """Sample current device and alert data whenever those files change."""
+    noc = NOC_DATA.snapshot()
+    now = time.time()
+    if "devices" in changed:
+        devices = noc["devices"]
+        for d in devices:
+            for metric in DEVICE_METRICS:
+                METRICS.append(metric, d.get(metric), now, series=d["id"])
+        if devices:
+            _, overview = score_fleet(devices)
+            METRICS.append("avgHealthScore", overview["avgHealthAll"], now)
+    if "alerts" in changed:
+        open_count = sum(1 for a in noc["alerts"] if a["status"] == "open")
+        METRICS.append("openIncidentsCount", open_count, now)
+
+
+seed_trend_history(NOC_DATA.get("trends"))
+record_noc_metrics(list(NOC_FILES))
+NOC_DATA.subscribe(record_noc_metrics)
+
+# Indexed alerts with running counters, synced on every alerts.json change
+ALERT_STORE = AlertStore(NOC_DATA.get("alerts"))
+
+
+def sync_alerts(changed):
+    if "alerts" not in changed:
+        return
+    delta = ALERT_STORE.replace_all(NOC_DATA.get("alerts"))
+    if not any(delta.values()):
+        return
+
+    # alerts are bucketed by the status they moved into
+    opened, closed, updated = [], [], []
+    for old, new in [(None, a) for a in delta["added"]] + delta["updated"]:
+        was_open = old is not None and old.get("status") == "open"
+        is_open = new.get("status") == "open"
+        if is_open and not was_open:
+            opened.append(new)
+        elif was_open and not is_open or old is None:
+            closed.append(new)
+        else:
+            updated.append(new)
+
+    EVENTS.publish("alerts", {
+        "opened": opened,
+        "closed": closed,
+        "updated": updated,
+        "removed": [a["id"] for a in delta["removed"]],
+        "summary": ALERT_STORE.summary(),
+    })
+
+
+NOC_DATA.subscribe(sync_alerts)
+
+# Recommendations, kept up to date rule by rule as the data files change
+INSIGHTS = InsightsEngine()
+INSIGHT_FEEDS = {
+    "devices": INSIGHTS.sync_devices,
+    "alerts": INSIGHTS.sync_alerts,
+    "automation": INSIGHTS.sync_automation,
+    "compliance": INSIGHTS.sync_compliance,
+}
+
+
+def sync_insights(changed):
+    for name in changed:
+        if name in INSIGHT_FEEDS:
+            INSIGHT_FEEDS[name](NOC_DATA.get(name))
+
+
+sync_insights(list(INSIGHT_FEEDS))
+NOC_DATA.subscribe(sync_insights)
+
+# Last computed health per device, diffed on every devices.json change
+HEALTH_SCORES = {}
+
+
+def publish_health_changes(changed):
+    if "devices" not in changed:
+        return
+    devices = NOC_DATA.get("devices")
+    scores, overview = score_fleet(devices)
+    current = dict(zip((d["id"] for d in devices), scores))
+
+    updates = [
+        {"id": d["id"], "name": d.get("name"), "computedHealth": score,
+         "previous": HEALTH_SCORES.get(d["id"])}
+        for d, score in zip(devices, scores) if HEALTH_SCORES.get(d["id"]) != score
+    ]
+    removed = [i for i in HEALTH_SCORES if i not in current]
+    HEALTH_SCORES.clear()
+    HEALTH_SCORES.update(current)
+
+    if updates or removed:
+        EVENTS.publish("health", {"devices": updates, "removed": removed, "overview": overview})
+
+
+HEALTH_SCORES.update(zip((d["id"] for d in NOC_DATA.get("devices")), score_fleet(NOC_DATA.get("devices"))[0]))
+NOC_DATA.subscribe(publish_health_changes)
+
+# Config backup history; backups.json entries are imported as metadata-only records
+BACKUP_STORE = BackupStore(
+    os.getenv("BACKUP_DB", "config_backups.db"), os.getenv("BACKUP_DIR", "config_backups")
+)
+
+
+def sync_backups(changed):
+    if "backups" in changed:
+        BACKUP_STORE.import_entries(NOC_DATA.get("backups"))
+
+
+sync_backups(["backups"])
+NOC_DATA.subscribe(sync_backups)
+
+
+def config_diff(before, after):
+    """Line/section diff of two backup records, or None unless both hold a stored config."""
+    if not all(r.get("configHash") and BACKUP_STORE.has_config(r["configHash"]) for r in (before, after)):
+        return None
+    return diff_configs(
+        lambda: BACKUP_STORE.iter_config(before["configHash"]),
+        lambda: BACKUP_STORE.iter_config(after["configHash"]),
+    )
+
+# Persisted automation run log: automation.json tasks plus live pushes, discoveries and sweeps
+AUTOMATION_LOG = AutomationLog(os.getenv("AUTOMATION_DB", "automation_log.db"))
+
+
+def sync_automation_log(changed):
+    if "automation" in changed:
+        AUTOMATION_LOG.import_tasks(NOC_DATA.get("automation"))
+
+
+sync_automation_log(["automation"])
+NOC_DATA.subscribe(sync_automation_log)
+
+# live runs also count towards the "failed automation tasks" recommendation
+for task in AUTOMATION_LOG.live_runs():
+    INSIGHTS.add_task(task)
+
+
+def record_run(task_type, status, started, ended, devices, summary):
+    """Append a finished run to the automation log, the success-rate trend and the insights."""
+    INSIGHTS.add_task(AUTOMATION_LOG.record(task_type, status, started, ended, devices=devices, summary=summary))
+    METRICS.append("automationSuccessRate", 100 if status == "success" else 0, ended)
+
+
+def logged_run(task_type, devices, summary, fn, ok=lambda result: True):
+    """Run fn() and log its outcome with record_run."""
+    started = time.time()
+    status = "failed"
+    try:
+        result = fn()
+        status = "success" if ok(result) else "failed"
+        return result
+    finally:
+        record_run(task_type, status, started, time.time(), devices, summary)
+
+
+def succeeded(result):
+    return result.get("status") == "success"
+
+
+# on-demand sweeps (API requests and jobs) are logged; background polls are not
+STATUS_POLLER.subscribe_sweeps(lambda started, ended, error: record_run(
+    "status-sweep", "failed" if error else "success", started, ended, [], "On-demand reachability sweep"
+))
+subscribe_rollouts(lambda ro: record_run(
+    "config-rollout", "success" if ro.status == "succeeded" else "failed", ro.started, ro.ended,
+    [t["ip"] for t in ro.targets], f"Staged rollout {ro.id} ({len(ro.targets)} devices)"
+))
+
+# Adjacency-indexed graph of NOC devices/links plus discovery CDP neighbors
+TOPOLOGY = TopologyGraph()
+TOPOLOGY_LOD = TopologyLOD(TOPOLOGY)
+TOPOLOGY_SOURCES = {"inventory": None}
+
+
+def current_topology():
+    """The topology graph, re-synced (incrementally) if the inventory changed since last time."""
+    version = inventory_version()
+    if TOPOLOGY_SOURCES["inventory"] != version:
+        sync_topology(["inventory"])
+        TOPOLOGY_SOURCES["inventory"] = version
+    return TOPOLOGY
+
+
+def sync_topology(changed):
+    if not {"devices", "links", "inventory"} & set(changed):
+        return
+    noc = NOC_DATA.snapshot()
+    TOPOLOGY.sync(noc["devices"], noc["links"] + discovery_links(load_inventory()))
+
+
+NOC_DATA.subscribe(sync_topology)
+
+
+@app.before_request
+def start_data_watcher():
+    NOC_DATA.start()
+
+
+def reload_noc_data(*names):
+    """Force a re-read of NOC data files (all by default); dependent aggregates are invalidated."""
+    names = names or tuple(NOC_FILES)
+    NOC_DATA.check(force=names)
+    return list(names)
 
 # =========================================================
 #  OLD BACKEND APIs
@@ -51,7 +401,7 @@ TRENDS = load_json("trends.json")
 # --------------------------
 # RUN SINGLE SSH COMMAND
 # --------------------------
-from netmiko import ConnectHandler
+from ssh_pool import ssh_session
 
 @app.route("/api/run-command", methods=["POST"])
 def api_run_command():
@@ -71,18 +421,8 @@ def api_run_command():
         return jsonify({"error": "command required"}), 400
 
     try:
-        device = {
-            "device_type": "cisco_ios",
-            "host": ip,
-            "username": username,
-            "password": password
-        }
-
-        ssh = ConnectHandler(**device)
-        ssh.enable()
-
-        output = ssh.send_command(command)
-        ssh.disconnect()
+        with ssh_session(ip, username, password) as ssh:
+            output = ssh.send_command(command)
 
         return jsonify({
             "success": True,
@@ -95,32 +435,155 @@ def api_run_command():
             "error": str(e)
         }), 500
 
+# --------------------------
+# RUN COMMANDS ON MANY DEVICES
+# --------------------------
+def layer_device_ips(layer):
+    return {d["ipAddress"] for d in NOC_DATA.get("devices") if d.get("layer") == layer}
+
+
+def selected_ips(data):
+    """The optional "ips" selector; None if absent, ValueError unless a list of strings."""
+    ips = data.get("ips")
+    if ips is not None and not (isinstance(ips, list) and all(isinstance(ip, str) for ip in ips)):
+        raise ValueError("ips must be a list of IP strings")
+    return ips
+
+
+@app.route("/api/run-command/batch", methods=["POST"])
+def api_run_command_batch():
+    """
+    Body: {"ips": [...]} and/or {"filter": {"vendor": .., "layer": ..}},
+    "commands": [...], optional "username"/"password"/"concurrency".
+    Streams one JSON result per device as it finishes (NDJSON, or SSE
+    with ?format=sse), followed by a final {"done": true, ...} record.
+    """
+    data = request.json or {}
+
+    commands = data.get("commands") or ([data["command"]] if data.get("command") else [])
+    if not commands:
+        return jsonify({"error": "commands required"}), 400
+    try:
+        ips = selected_ips(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    selector = data.get("filter") or {}
+    layer_ips = None
+    if selector.get("layer"):
+        layer_ips = layer_device_ips(selector["layer"])
+
+    targets = select_targets(
+        load_inventory(),
+        ips=ips,
+        vendor=selector.get("vendor"),
+        layer_ips=layer_ips,
+        username=data.get("username"),
+        password=data.get("password"),
+    )
+    if not targets:
+        return jsonify({"error": "No devices matched"}), 404
+
+    try:
+        concurrency = int(data.get("concurrency", BATCH_CONCURRENCY))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Invalid concurrency"}), 400
+
+    sse = request.args.get("format") == "sse"
+
+    def encode(obj):
+        line = json.dumps(obj)
+        return f"data: {line}\n\n" if sse else line + "\n"
+
+    def generate():
+        succeeded = 0
+        for result in run_batch(targets, commands, concurrency):
+            succeeded += result["success"]
+            yield encode(result)
+        yield encode({
+            "done": True,
+            "total": len(targets),
+            "succeeded": succeeded,
+            "failed": len(targets) - succeeded,
+        })
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream" if sse else "application/x-ndjson",
+    )
+
+
 @app.route("/api/inventory", methods=["GET"])
 def api_inventory():
-    return jsonify(load_inventory())
+    return cached_json("inventory", inventory_version(), load_inventory)
 
 
 @app.route("/api/status", methods=["GET"])
 def api_status():
-    return jsonify(get_device_status("network_inventory.json"))
+    detail = request.args.get("detail", "").lower() in ("1", "true", "yes")
+    max_age = request.args.get("max_age", type=float)
+
+    STATUS_POLLER.start()
+    if wants_async():
+        return job_accepted(job_manager.submit(
+            "status-sweep", lambda job: STATUS_POLLER.refresh(max_age=max_age)
+        ))
+    snapshot = STATUS_POLLER.snapshot(max_age=max_age)
+
+    resp = jsonify(snapshot if detail else snapshot["status"])
+    resp.headers["X-Checked-At"] = snapshot["checkedAt"]
+    return resp
+
+
+@app.route("/api/status/transitions", methods=["GET"])
+def api_status_transitions():
+    limit = request.args.get("limit", 100, type=int)
+    return jsonify({
+        "transitions": STATUS_POLLER.transitions(request.args.get("hostname"), limit)
+    })
 
 
 @app.route("/api/discover", methods=["POST"])
 def api_discover():
     data = request.json
     start_ip = data.get("start_ip")
+    incremental = bool(data.get("incremental", False))
 
-    if not start_ip:
+    if not start_ip and not incremental:
         return jsonify({"success": False, "error": "start_ip required"}), 400
+    try:
+        workers = int(data["workers"]) if data.get("workers") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "error": "Invalid workers"}), 400
+    discovery_summary = "Incremental discovery" if incremental else f"Discovery from {start_ip}"
+
+    if wants_async(data):
+        return job_accepted(job_manager.submit(
+            "discovery", lambda job: logged_run(
+                "discovery", [start_ip] if start_ip else [], discovery_summary,
+                lambda: run_discovery_api(start_ip, workers=workers, incremental=incremental, job=job),
+                ok=succeeded
+            )
+        ))
     
     try:
-        result = run_discovery_api(start_ip)
+        result = logged_run(
+            "discovery", [start_ip] if start_ip else [], discovery_summary,
+            lambda: run_discovery_api(start_ip, workers=workers, incremental=incremental),
+            ok=succeeded
+        )
+        if result.get("status") != "success":
+            return jsonify({"success": False, "error": result.get("message")}), 500
 
         return jsonify({
             "success": True,
             "devices_found": result.get("total_devices", 0),
             "new_devices": result.get("new_devices", []),
             "inventory": result.get("all_devices", []),
+            "added": result.get("added", []),
+            "removed": result.get("removed", []),
+            "changed": result.get("changed", []),
+            "unreachable": result.get("unreachable", []),
         })
 
     except Exception as e:
@@ -150,89 +613,236 @@ def api_delete_device(ip):
     return jsonify(delete_device_from_inventory(ip))
 
 
+def parse_config_commands(data):
+    """Accept either a `config` textarea or a `commands` list."""
+    raw_config = data.get("config")
+
+    # Convert textarea → commands list
+    if raw_config:
+        return [line.strip() for line in raw_config.split("\n") if line.strip()]
+    return data.get("commands")
+
+
+@app.route("/api/inventory/bulk", methods=["POST", "PUT", "PATCH", "DELETE"])
+def api_inventory_bulk():
+    """
+    Bulk inventory changes in one transaction:
+      POST   → create (existing IPs are reported as errors)
+      PUT    → upsert (create or replace)
+      PATCH  → update existing devices (fields are merged)
+      DELETE → delete by IP
+    Body: JSON list of devices (or {"devices": [...]}), or text/csv with a
+    header row. DELETE also accepts {"ips": [...]}. ?atomic=1 rejects the
+    whole batch if any row fails.
+    """
+    mode = {"POST": "create", "PUT": "upsert", "PATCH": "update", "DELETE": "delete"}[request.method]
+    atomic = request.args.get("atomic", "").lower() in ("1", "true", "yes")
+
+    if request.mimetype == "text/csv":
+        rows = rows_from_csv(request.get_data(as_text=True))
+    else:
+        body = request.get_json(silent=True)
+        if isinstance(body, dict):
+            rows = body.get("devices") or [{"ip": ip} for ip in body.get("ips", [])]
+        else:
+            rows = body
+    if not isinstance(rows, list) or not rows:
+        return jsonify({"error": "A non-empty list of devices is required"}), 400
+
+    result = bulk_inventory(rows, mode=mode, atomic=atomic)
+    rejected = atomic and result["failed"]
+    return jsonify(result), (409 if rejected else 200)
+
+
 @app.route("/api/config", methods=["POST"])
 def api_push_config():
     data = request.json
 
     ip = data.get("ip")
-    raw_config = data.get("config")
-    commands = data.get("commands")
 
     if not ip:
         return jsonify({"error": "IP required"}), 400
     
-    # Convert textarea → commands list
-    if raw_config:
-        commands = [line.strip() for line in raw_config.split("\n") if line.strip()]
+    commands = parse_config_commands(data)
 
     if not commands:
         return jsonify({"error": "No commands provided"}), 400
 
     # Find credentials from inventory
-    devices = load_inventory()
-    dev = next((d for d in devices if d["ip"] == ip), None)
+    dev = find_device(ip)
 
     if not dev:
         return jsonify({"error": "Device not found"}), 404
 
-    result = push_config(
+    push = dict(
         ip=ip,
         username=dev.get("username"),
         password=dev.get("password"),
         commands=commands
     )
+    summary = f"Config push ({len(commands)} commands)"
+    if wants_async(data):
+        return job_accepted(job_manager.submit(
+            "config-push", lambda job: logged_run("config-push", [ip], summary, lambda: push_config(**push), ok=succeeded)
+        ))
+
+    result = logged_run("config-push", [ip], summary, lambda: push_config(**push), ok=succeeded)
 
     return jsonify(result)
 
+# --------------------------
+# STAGED CONFIG ROLLOUT
+# --------------------------
+@app.route("/api/config/rollout", methods=["POST"])
+def api_config_rollout():
+    """
+    Body: target selector ("ips" and/or "filter" as in /api/run-command/batch),
+    "config" or "commands", and optional "canarySize", "waveSize",
+    "parallelism", "maxFailureRate". Returns the rollout ID immediately.
+    """
+    data = request.json or {}
+
+    commands = parse_config_commands(data)
+    if not commands:
+        return jsonify({"error": "No commands provided"}), 400
+    try:
+        ips = selected_ips(data)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Credentials always come from the inventory for pushes, so every IP must be known
+    inventory = load_inventory()
+    missing = unknown_ips(inventory, ips or [])
+    if missing:
+        return jsonify({"error": "Devices not in inventory", "ips": missing}), 404
+
+    selector = data.get("filter") or {}
+    layer_ips = None
+    if selector.get("layer"):
+        layer_ips = layer_device_ips(selector["layer"])
+
+    targets = select_targets(
+        inventory,
+        ips=ips,
+        vendor=selector.get("vendor"),
+        layer_ips=layer_ips,
+    )
+    if not targets:
+        return jsonify({"error": "No devices matched"}), 404
+
+    options = {}
+    try:
+        for field, key, cast in (
+            ("canarySize", "canary_size", int),
+            ("waveSize", "wave_size", int),
+            ("parallelism", "parallelism", int),
+            ("maxFailureRate", "max_failure_rate", float),
+        ):
+            if data.get(field) is not None:
+                options[key] = cast(data[field])
+    except (TypeError, ValueError):
+        return jsonify({"error": f"Invalid {field}"}), 400
+
+    rollout = start_rollout(targets, commands, **options)
+    return jsonify({"id": rollout.id, "status": rollout.status,
+                    "totalDevices": len(targets)}), 202
+
+
+@app.route("/api/config/rollout/<rollout_id>", methods=["GET"])
+def api_config_rollout_status(rollout_id):
+    rollout = get_rollout(rollout_id)
+    if not rollout:
+        return jsonify({"error": "Rollout not found"}), 404
+    return jsonify(rollout.to_dict())
+
+
+@app.route("/api/config/rollout/<rollout_id>/abort", methods=["POST"])
+def api_config_rollout_abort(rollout_id):
+    rollout = get_rollout(rollout_id)
+    if not rollout:
+        return jsonify({"error": "Rollout not found"}), 404
+    rollout.abort()
+    return jsonify({"id": rollout.id, "status": rollout.status, "reason": rollout.reason})
+
+# --------------------------
+# BACKGROUND JOBS
+# --------------------------
+@app.route("/api/jobs", methods=["GET"])
+def api_jobs():
+    jobs = job_manager.list(kind=request.args.get("kind"))
+    return jsonify({"jobs": [j.to_dict(include_result=False) for j in jobs]})
+
+
+@app.route("/api/jobs/<job_id>", methods=["GET"])
+def api_job(job_id):
+    job = job_manager.get(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    return jsonify(job.to_dict())
+
+
+@app.route("/api/jobs/<job_id>", methods=["DELETE"])
+def api_cancel_job(job_id):
+    job = job_manager.cancel(job_id)
+    if not job:
+        return jsonify({"error": "Job not found"}), 404
+    rollout = get_rollout(job_id)
+    if rollout:
+        rollout.abort("cancelled")
+    return jsonify(job.to_dict(include_result=False))
+
 # =========================================================
 #  NOC / DASHBOARD APIS
 # =========================================================
 
 @app.route("/api/devices", methods=["GET"])
 def api_devices():
-    return jsonify({"devices": DEVICES})
+    return cached_json(
+        "devices", NOC_CACHE.generation("devices"), lambda: {"devices": NOC_DATA.get("devices")}
+    )
 
 
 @app.route("/api/health", methods=["GET"])
 def api_health():
-    overview = compute_health_overview(DEVICES)
+    return cached_json(
+        "health", NOC_CACHE.generation("devices"), lambda: build_health(NOC_DATA.get("devices"))
+    )
+
+
+def build_health(devices):
+    scores, overview = score_fleet(devices)
     
     devices_health = []
-    for d in DEVICES:
+    for d, score in zip(devices, scores):
         dd = d.copy()
-        dd["computedHealth"] = compute_device_health_score(d)
+        dd["computedHealth"] = score
         devices_health.append(dd)
 
-    return jsonify({"overview": overview, "devices": devices_health})
+    return {"overview": overview, "devices": devices_health}
 
 
 @app.route("/api/automation/summary", methods=["GET"])
 def api_automation_summary():
+    return jsonify(AUTOMATION_LOG.summary())
 
-    total = len(AUTOMATION)
-    success = sum(1 for t in AUTOMATION if t["status"] == "success")
-
-    by_type = {}
-    for t in AUTOMATION:
-        by_type[t["taskType"]] = by_type.get(t["taskType"], 0) + 1
-
-    recent = sorted(AUTOMATION, key=lambda x: x["startedAt"], reverse=True)[:10]
 
+@app.route("/api/automation/runs", methods=["GET"])
+def api_automation_runs():
+    limit = max(1, min(request.args.get("limit", 50, type=int), 500))
+    runs = AUTOMATION_LOG.recent(limit, task_type=request.args.get("taskType"),
+                                 before=request.args.get("before"))
     return jsonify({
-        "total": total,
-        "success": success,
-        "failed": total - success,
-        "byType": by_type,
-        "recent": recent
+        "runs": runs,
+        "nextBefore": runs[-1]["startedAt"] if runs and len(runs) == limit else None,
     })
 
 
 @app.route("/api/config/<device_id>", methods=["GET"])
 def api_config_diff(device_id):
-    r = get_before_after_for_device(device_id, BACKUPS)
-    if not r:
+    r = BACKUP_STORE.latest(device_id, 2)
+    if len(r) < 2:
         return jsonify({"error": "Device or backups not found"}), 404
-    
+
     before, after = r
     diff_summary = compute_diff_summary(before, after)
 
@@ -240,63 +850,362 @@ def api_config_diff(device_id):
         "deviceId": device_id,
         "before": before,
         "after": after,
-        "diffSummary": diff_summary
+        "diffSummary": diff_summary,
+        "configDiff": config_diff(before, after)
     })
 
 
+@app.route("/api/backups/<device_id>", methods=["POST"])
+def api_add_backup(device_id):
+    """Store a running-config: {"config", "configVersion"?, "timestamp"?, "changes"?}."""
+    data = request.get_json(silent=True) or {}
+    if not isinstance(data.get("config"), str):
+        return jsonify({"error": "config text required"}), 400
+
+    try:
+        record = BACKUP_STORE.add(
+            device_id, data["config"], timestamp=data.get("timestamp"),
+            config_version=data.get("configVersion"), changes=data.get("changes")
+        )
+    except sqlite3.IntegrityError:
+        return jsonify({"error": "Backup with this timestamp and configVersion already exists"}), 409
+
+    return jsonify(record), 201
+
+
+@app.route("/api/backups/<device_id>", methods=["GET"])
+def api_backups(device_id):
+    limit = max(1, min(request.args.get("limit", 50, type=int), 1000))
+    return jsonify({
+        "deviceId": device_id,
+        "backups": BACKUP_STORE.history(device_id, limit=limit, before=request.args.get("before")),
+    })
+
+
+@app.route("/api/backups/<device_id>/<ref>/config", methods=["GET"])
+def api_backup_config(device_id, ref):
+    record = BACKUP_STORE.get(device_id, ref)
+    lines = BACKUP_STORE.iter_config(record["configHash"]) if record and record["configHash"] else None
+    if lines is None:
+        return jsonify({"error": "Backup config not found"}), 404
+    return Response(lines, mimetype="text/plain")
+
+
+@app.route("/api/backups/<device_id>/diff", methods=["GET"])
+def api_backup_diff(device_id):
+    """Diff two backups (?from=&to= by id, configVersion or timestamp; default the last two)."""
+    if request.args.get("from") or request.args.get("to"):
+        refs = (request.args.get("from"), request.args.get("to"))
+        if not all(refs):
+            return jsonify({"error": "from and to are both required"}), 400
+        before, after = (BACKUP_STORE.get(device_id, ref) for ref in refs)
+        if not before or not after:
+            return jsonify({"error": "Backup not found"}), 404
+    else:
+        latest = BACKUP_STORE.latest(device_id, 2)
+        if len(latest) < 2:
+            return jsonify({"error": "Device or backups not found"}), 404
+        before, after = latest
+
+    diff = config_diff(before, after)
+    if diff is None:
+        return jsonify({"error": "Both backups need a stored config to diff"}), 422
+
+    return jsonify({"deviceId": device_id, "from": before, "to": after, **diff})
+
+
 @app.route("/api/compliance", methods=["GET"])
 def api_compliance():
-    return jsonify(evaluate_compliance_overview(DEVICES, COMPLIANCE))
+    return jsonify(NOC_CACHE.get(
+        "compliance", ("devices", "compliance"),
+        lambda: evaluate_compliance_overview(NOC_DATA.get("devices"), NOC_DATA.get("compliance"))
+    ))
+
+
+@app.route("/api/compliance/evaluate", methods=["POST"])
+def api_compliance_evaluate():
+    """
+    Evaluate running-configs against the compliance rules.
+    Body: {"configs": {deviceId: text} or [{"deviceId", "config"}], "rules": [...]}
+    (rules default to compliance.json). Results use the compliance.json
+    format; ?overview=1 adds the /api/compliance style summary.
+    """
+    data = request.get_json(silent=True) or {}
+    configs = data.get("configs")
+    if isinstance(configs, list):
+        configs = {c.get("deviceId"): c.get("config") for c in configs}
+    if not configs or not all(isinstance(k, str) and isinstance(v, str) for k, v in configs.items()):
+        return jsonify({"error": "configs must map deviceId to config text"}), 400
+
+    rules = data.get("rules") or NOC_DATA.get("compliance").get("rules", [])
+    try:
+        evaluation = COMPLIANCE_ENGINE.evaluate(configs, rules)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    result = {"rules": rules, **evaluation}
+    if request.args.get("overview", "").lower() in ("1", "true", "yes"):
+        result["overview"] = evaluate_compliance_overview(NOC_DATA.get("devices"), result)
+    return jsonify(result)
 
 
 @app.route("/api/alerts", methods=["GET"])
 def api_alerts():
-    total = len(ALERTS)
-    open_count = sum(1 for a in ALERTS if a["status"] == "open")
-    by_severity = {}
-
-    for a in ALERTS:
-        by_severity[a["severity"]] = by_severity.get(a["severity"], 0) + 1
-
-    recent = sorted(ALERTS, key=lambda x: x["openedAt"], reverse=True)[:20]
+    """
+    Counters over all alerts plus the newest 20. Optional filters narrow
+    `recent`: deviceId, severity, status (comma-separated values), since,
+    until (ISO openedAt bounds), limit, and cursor (from nextCursor).
+    """
+    summary = ALERT_STORE.summary()
+
+    filters = {f: request.args[f].split(",") for f in INDEXED_FIELDS if request.args.get(f)}
+    paged = filters or any(k in request.args for k in ("since", "until", "limit", "cursor"))
+    if not paged:
+        return jsonify({**summary, "recent": ALERT_STORE.recent(20)})
+
+    limit = max(1, min(request.args.get("limit", 20, type=int), 500))
+    try:
+        items, next_cursor = ALERT_STORE.query(
+            filters, limit=limit, cursor=request.args.get("cursor"),
+            since=request.args.get("since"), until=request.args.get("until")
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    return jsonify({
-        "total": total,
-        "open": open_count,
-        "closed": total - open_count,
-        "bySeverity": by_severity,
-        "recent": recent
-    })
+    return jsonify({**summary, "recent": items, "nextCursor": next_cursor})
 
 
 @app.route("/api/trends", methods=["GET"])
 def api_trends():
+    """
+    range=7 / range=30 with no other parameters returns the trends.json series.
+    Anything else is answered from the metric store:
+      range=14d|24h|90m, step=1d|1h|5m|300, metric=a,b, series=fleet|<deviceId>,
+      agg=avg|sum|min|max|last|count, end=<ISO date or epoch> (default now)
+    """
+    range_arg = request.args.get("range", "7")
+    extra = ("step", "metric", "series", "agg", "end")
+
+    if range_arg in ("7", "30") and not any(k in request.args for k in extra):
+        return jsonify({
+            "range": int(range_arg),
+            "data": NOC_DATA.get("trends").get(f"{range_arg}d", [])
+        })
+
+    series = request.args.get("series", "fleet")
+    agg = request.args.get("agg", "avg")
+    metrics = [m for arg in request.args.getlist("metric") for m in arg.split(",") if m]
+    if not metrics:
+        metrics = TREND_METRICS if series == "fleet" else DEVICE_METRICS
+
     try:
-        range_val = int(request.args.get("range", 7))
-    except ValueError:
-        return jsonify({"error": "Invalid range"}), 400
+        span = parse_duration(range_arg)
+        if request.args.get("step"):
+            step = parse_duration(request.args["step"], default_unit="s")
+        else:
+            step = 60 if span <= 3 * 3600 else (3600 if span <= 2 * 86400 else 86400)
+        end = parse_timestamp(request.args["end"]) if request.args.get("end") else time.time()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if span // step > 10000:
+        return jsonify({"error": "Too many points; use a larger step"}), 400
 
-    if range_val not in [7, 30]:
-        return jsonify({"error": "Use range=7 or range=30"}), 400
+    try:
+        data = METRICS.query_table(metrics, end - span, end, step, series, agg)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
     return jsonify({
-        "range": range_val,
-        "data": TRENDS.get(f"{range_val}d", [])
+        "range": range_arg,
+        "step": step,
+        "series": series,
+        "agg": agg,
+        "data": data
     })
 
 
 @app.route("/api/recommendations", methods=["GET"])
 def api_recommendations():
-    return jsonify({
-        "insights": generate_recommendations(
-            DEVICES, ALERTS, AUTOMATION, COMPLIANCE
-        )
-    })
+    return jsonify({"insights": INSIGHTS.recommendations()})
 
 
 @app.route("/api/topology", methods=["GET"])
 def api_topology():
-    return jsonify({"devices": DEVICES, "links": LINKS})
+    """
+    Without parameters: the devices.json/links.json lists. With any of
+      page, pageSize       page through the graph (nodes in id order)
+      layer, role, site    only nodes with these values (comma-separated)
+      around, depth        only nodes within `depth` hops of `around`
+    the graph (including discovery neighbors) is exported instead.
+      lod=layer|site       clustered view with layout (collapse=access,... for lod=layer)
+      format=ndjson        stream the (lod or full) graph in chunks of `chunk` items
+    """
+    if request.args.get("lod") or request.args.get("format") == "ndjson":
+        return topology_view()
+
+    filters = {f: set(request.args[f].split(",")) for f in ("layer", "role", "site") if request.args.get(f)}
+    if not filters and not any(k in request.args for k in ("page", "pageSize", "around")):
+        def build():
+            noc = NOC_DATA.snapshot()
+            return {"devices": noc["devices"], "links": noc["links"]}
+
+        return cached_json("topology", NOC_CACHE.generation("devices", "links"), build)
+
+    graph = current_topology()
+    page = max(0, request.args.get("page", 0, type=int))
+    page_size = max(1, min(request.args.get("pageSize", 500, type=int), 5000))
+    around = request.args.get("around")
+    depth = max(0, min(request.args.get("depth", 1, type=int), 10))
+
+    def build():
+        node_ids = graph.neighborhood(around, depth) if around else list(graph.nodes)
+        node_ids = [n for n in node_ids
+                    if all(graph.nodes[n].get(f) in values for f, values in filters.items())]
+        return graph.page(page, page_size, node_ids)
+
+    # keyed only by what build() reads, so unrelated query parameters share an entry
+    key = "topology?" + "&".join(
+        [f"page={page}", f"pageSize={page_size}", f"around={around or ''}", f"depth={depth if around else ''}"]
+        + [f"{f}={','.join(sorted(values))}" for f, values in sorted(filters.items())]
+    )
+    return cached_json(key, graph.version, build)
+
+
+def lod_args():
+    return request.args.get("lod", "layer"), tuple(request.args.get("collapse", "access").split(","))
+
+
+def topology_view():
+    graph = current_topology()
+    lod, collapse = lod_args()
+    if lod not in LOD_MODES:
+        return jsonify({"error": f"lod must be one of {', '.join(LOD_MODES)}"}), 400
+
+    if request.args.get("lod"):
+        build = lambda: TOPOLOGY_LOD.view(lod, collapse)
+    else:
+        def build():
+            snapshot = graph.export()
+            return {"lod": None, "version": snapshot["version"],
+                    "nodes": snapshot["nodes"], "edges": snapshot["links"]}
+
+    if request.args.get("format") != "ndjson":
+        key = f"topology-lod?{lod}&{','.join(sorted(collapse))}"
+        return cached_json(key, graph.version, build)
+
+    chunk = max(1, min(request.args.get("chunk", 500, type=int), 10000))
+    view = build()
+    return Response(
+        stream_with_context(json.dumps(record) + "\n" for record in iter_chunks(view, chunk)),
+        mimetype="application/x-ndjson",
+    )
+
+
+@app.route("/api/topology/clusters/<path:cluster_id>", methods=["GET"])
+def api_topology_cluster(cluster_id):
+    """Expand a cluster of a lod view (same lod/collapse parameters) into its members."""
+    lod, collapse = lod_args()
+    if lod not in LOD_MODES:
+        return jsonify({"error": f"lod must be one of {', '.join(LOD_MODES)}"}), 400
+
+    current_topology()
+    expanded = TOPOLOGY_LOD.expand(cluster_id, lod, collapse)
+    if expanded is None:
+        return jsonify({"error": "Cluster not found"}), 404
+    return jsonify(expanded)
+
+
+@app.route("/api/topology/path", methods=["GET"])
+def api_topology_path():
+    src, dst = request.args.get("from"), request.args.get("to")
+    if not src or not dst:
+        return jsonify({"error": "from and to required"}), 400
+
+    path = current_topology().shortest_path(src, dst)
+    if path is None:
+        return jsonify({"error": f"No path between {src} and {dst}"}), 404
+    return jsonify({"from": src, "to": dst, "hops": len(path["links"]), **path})
+
+
+@app.route("/api/topology/impact/<node_id>", methods=["GET"])
+def api_topology_impact(node_id):
+    """Devices cut off from the core (or ?roots=a,b) if node_id fails."""
+    roots = [r for r in request.args.get("roots", "").split(",") if r] or None
+    result = current_topology().impact(node_id, roots)
+    if result is None:
+        return jsonify({"error": "Node not found"}), 404
+    return jsonify({**result, "count": len(result["impacted"])})
+
+
+@app.route("/api/topology/components", methods=["GET"])
+def api_topology_components():
+    components = current_topology().components()
+    return jsonify({
+        "count": len(components),
+        "components": [{"size": len(c), "nodes": c} for c in components],
+    })
+
+
+@app.route("/api/stream", methods=["GET"])
+def api_stream():
+    """
+    Server-Sent Events feed of dashboard deltas. ?topics=alerts,status,health,tickets
+    picks the topics (all by default). A `resync` event means this client fell
+    behind and should re-fetch the full payloads.
+    """
+    topics = [t for t in request.args.get("topics", ",".join(TOPICS)).split(",") if t]
+    unknown = [t for t in topics if t not in TOPICS]
+    if unknown or not topics:
+        return jsonify({"error": f"topics must be among {', '.join(TOPICS)}"}), 400
+
+    # IDs from before a restart (or otherwise unknown) get a resync event
+    last_id = request.headers.get("Last-Event-ID") or request.args.get("lastEventId") or None
+
+    if "status" in topics:
+        STATUS_POLLER.start()
+    sub = EVENTS.subscribe(topics, last_event_id=last_id)
+
+    def generate():
+        try:
+            yield "retry: 5000\n\n"
+            while True:
+                events = sub.get(timeout=STREAM_HEARTBEAT)
+                if sub.take_resync():
+                    yield "event: resync\ndata: {}\n\n"
+                if not events:
+                    yield ": keepalive\n\n"
+                for event in events:
+                    yield event.frame
+        finally:
+            EVENTS.unsubscribe(sub)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.route("/api/data/reload", methods=["POST"])
+def api_reload_data():
+    """Reload NOC data files; body {"datasets": [...]} limits which ones."""
+    names = (request.get_json(silent=True) or {}).get("datasets") or []
+    unknown = [n for n in names if n not in NOC_FILES]
+    if unknown:
+        return jsonify({"error": f"Unknown datasets: {', '.join(unknown)}"}), 400
+
+    try:
+        reloaded = reload_noc_data(*names)
+    except (OSError, ValueError) as e:
+        return jsonify({"error": str(e)}), 500
+
+    return jsonify({"reloaded": reloaded, "cache": NOC_CACHE.stats(), "responses": RESPONSE_CACHE.stats()})
+
+
+@app.route("/metrics", methods=["GET"])
+def prometheus_metrics():
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4")
 
 
 @app.route("/api/ping", methods=["GET"])
@@ -309,8 +1218,9 @@ def ping():
 
 @app.route("/api/tickets", methods=["GET"])
 def api_tickets():
+    max_age = request.args.get("max_age", type=float)
     try:
-        tickets = get_incidents()  # Fetch live from ServiceNow
+        tickets = TICKET_SYNC.tickets(max_age=max_age)  # synced from ServiceNow
         return jsonify(tickets)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
@@ -318,8 +1228,7 @@ def api_tickets():
 @app.route("/api/tickets/count", methods=["GET"])
 def api_tickets_count():
     try:
-        tickets = get_incidents()  # get from ServiceNow
-        return jsonify({"count": len(tickets)})
+        return jsonify({"count": TICKET_SYNC.count()})  # ServiceNow aggregate API
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 # --------------------------------------------------
@@ -0,0 +1,87 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from inventory import device_ips
+from ssh_pool import ssh_session
+
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "20"))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", "100"))
+
+
+def _by_ip(inventory):
+    by_ip = {}
+    for d in inventory:
+        for ip in device_ips(d):
+            by_ip.setdefault(ip, d)
+    return by_ip
+
+
+def unknown_ips(inventory, ips):
+    """The requested IPs that are not an interface of any inventory device."""
+    by_ip = _by_ip(inventory)
+    return [ip for ip in dict.fromkeys(ips) if ip not in by_ip]
+
+
+def select_targets(inventory, ips=None, vendor=None, layer_ips=None, username=None, password=None):
+    """
+    Resolve a device selector into [{ip, hostname, username, password}].
+
+    `ips` picks devices explicitly (unknown IPs are allowed when request
+    credentials are given); `vendor` and `layer_ips` filter the inventory.
+    """
+    by_ip = _by_ip(inventory)
+
+    if ips:
+        candidates = [(ip, by_ip.get(ip)) for ip in dict.fromkeys(ips)]
+    else:
+        candidates = [(device_ips(d)[0], d) for d in inventory if device_ips(d)]
+
+    targets = []
+    for ip, dev in candidates:
+        dev = dev or {}
+        if vendor and (dev.get("vendor") or "").lower() != vendor.lower():
+            continue
+        if layer_ips is not None and not set(device_ips(dev) or [ip]) & layer_ips:
+            continue
+        targets.append({
+            "ip": ip,
+            "hostname": dev.get("hostname", ip),
+            "username": username or dev.get("username"),
+            "password": password or dev.get("password"),
+        })
+    return targets
+
+
+def run_commands(target, commands):
+    """Run a list of show commands on one device over a pooled session."""
+    start = time.perf_counter()
+    result = {"ip": target["ip"], "hostname": target.get("hostname")}
+
+    if not target.get("username") or not target.get("password"):
+        return {**result, "success": False, "error": "username and password required"}
+
+    try:
+        with ssh_session(target["ip"], target["username"], target["password"]) as ssh:
+            outputs = [{"command": c, "output": ssh.send_command(c)} for c in commands]
+        result.update({"success": True, "results": outputs})
+    except Exception as e:
+        result.update({"success": False, "error": str(e)})
+
+    result["elapsedMs"] = int((time.perf_counter() - start) * 1000)
+    return result
+
+
+def run_batch(targets, commands, concurrency=BATCH_CONCURRENCY):
+    """
+    Fan commands out across targets and yield per-device results as each
+    device finishes. Closing the generator cancels devices not started yet.
+    """
+    concurrency = max(1, min(concurrency, BATCH_MAX_CONCURRENCY))
+    pool = ThreadPoolExecutor(max_workers=concurrency)
+    try:
+        futures = [pool.submit(run_commands, t, commands) for t in targets]
+        for fut in as_completed(futures):
+            yield fut.result()
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
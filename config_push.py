@@ -1,16 +1,9 @@
-from netmiko import ConnectHandler
+from ssh_pool import ssh_session
 
 def push_config(ip, username, password, commands):
     try:
-        conn = ConnectHandler(
-            device_type="cisco_ios",
-            host=ip,
-            username=username,
-            password=password
-        )
-        conn.enable()
-        output = conn.send_config_set(commands)
-        conn.disconnect()
+        with ssh_session(ip, username, password) as conn:
+            output = conn.send_config_set(commands)
         return {"status": "success", "output": output}
 
     except Exception as e:
@@ -1,31 +1,24 @@
-from netmiko import ConnectHandler
+from ssh_pool import ssh_session
+from inventory import load_inventory, save_inventory
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+import threading
+import os
 import re
 import json
 
-# Globals
-visited = set()
-device_inventory = {}  # hostname → device object
-
 USERNAME = "netkode"
 PASSWORD = "netkode"
 
+# Worker pool sizing (override via .env / environment)
+DISCOVERY_WORKERS = int(os.getenv("DISCOVERY_WORKERS", "8"))
+DISCOVERY_MAX_WORKERS = int(os.getenv("DISCOVERY_MAX_WORKERS", "64"))
+DISCOVERY_MAX_DEVICES = int(os.getenv("DISCOVERY_MAX_DEVICES", "5000"))
 
-def connect(ip):
-    """Connect to device via SSH."""
-    try:
-        device = {
-            "device_type": "autodetect",
-            "host": ip,
-            "username": USERNAME,
-            "password": PASSWORD,
-            "timeout": 5,
-        }
-        conn = ConnectHandler(**device)
-        conn.enable()
-        return conn
-    except Exception as e:
-        print(f"[ERROR] Connection failed for {ip}: {e}")
-        return None
+
+def connect(ip, username=USERNAME, password=PASSWORD):
+    """Borrow a pooled, enabled SSH session to the device (use as a context manager)."""
+    return ssh_session(ip, username, password, device_type="autodetect", timeout=5)
 
 
 def get_vendor(output):
@@ -54,6 +47,22 @@ def parse_neighbors(output):
     return neighbors
 
 
+def short_hostname(hostname):
+    """CDP reports FQDNs (R1.network.local), the device itself reports R1."""
+    return hostname.split(".")[0].lower() if hostname else hostname
+
+
+def inventory_key(device):
+    """
+    Key of a stored device: its hostname, or its IP for devices added by hand
+    without one (hostname missing or "unknown"), so those never collapse.
+    """
+    hostname = device.get("hostname")
+    if hostname and hostname.lower() != "unknown":
+        return hostname
+    return device.get("ip") or (device.get("interfaces") or [None])[0]
+
+
 def collect_info(conn, ip):
     """Collect hostname, vendor, and neighbors from a device."""
     info = {"ip": ip}
@@ -79,75 +88,303 @@ def collect_info(conn, ip):
     return info
 
 
-def update_inventory(info):
-    """Add or update device info in the inventory."""
-    hostname = info["hostname"]
+class DiscoveryRun:
+    """
+    State for a single discovery run.
+
+    The CDP graph is walked breadth-first: a frontier of IPs is drained by a
+    pool of SSH workers, and every IP/hostname is claimed under a lock before
+    it is scheduled, so no device is logged into twice and concurrent runs
+    never share state.
+    """
+
+    def __init__(self, username=USERNAME, password=PASSWORD,
+                 workers=DISCOVERY_WORKERS, max_devices=DISCOVERY_MAX_DEVICES, job=None):
+        self.username = username
+        self.password = password
+        self.workers = max(1, min(workers, DISCOVERY_MAX_WORKERS))
+        self.max_devices = max_devices
+        self.job = job              # optional jobs.Job for progress/cancellation
+
+        self._lock = threading.Lock()
+        self.visited = set()        # IPs already scheduled (or known as aliases)
+        self.scheduled = 0          # devices scheduled for a scan, counted against max_devices
+        self.hosts = {}             # short hostname → inventory hostname (None while in flight)
+        self.aliases = {}           # short hostname → extra IPs learned from CDP
+        self.claims = {}            # in-flight IP → short hostname it was claimed for
+        self.device_inventory = {}  # hostname → device object
+
+    # ----------------------------
+    # Thread-safe bookkeeping
+    # ----------------------------
+    def claim(self, ip, hostname=None):
+        """
+        Reserve an IP for scanning. Returns False if the IP (or the device
+        behind it, by hostname) is already scheduled or the run is full.
+        """
+        key = short_hostname(hostname)
+        with self._lock:
+            if ip in self.visited:
+                return False
+            if key and key in self.hosts:
+                # Same device reached through another interface: remember the
+                # IP instead of opening a second SSH session to it.
+                self.visited.add(ip)
+                self._add_alias(key, ip)
+                return False
+            if self.scheduled >= self.max_devices:
+                return False
+            self.visited.add(ip)
+            self.scheduled += 1
+            if key:
+                self.hosts[key] = None
+                self.claims[ip] = key
+            return True
+
+    def release(self, ip):
+        """
+        The scan of `ip` failed. Hand its device claim to the next interface
+        learned for that device, if any, and return that IP to try instead;
+        otherwise drop the claim so the device can still be reached later.
+        """
+        with self._lock:
+            key = self.claims.pop(ip, None)
+            if key is None or self.hosts.get(key) is not None:
+                return None
+            fallbacks = self.aliases.get(key)
+            if fallbacks:
+                nxt = fallbacks.pop(0)
+                self.claims[nxt] = key
+                return nxt
+            self.aliases.pop(key, None)
+            del self.hosts[key]
+            return None
+
+    def _add_alias(self, key, ip):
+        hostname = self.hosts.get(key)
+        if hostname and hostname in self.device_inventory:
+            interfaces = self.device_inventory[hostname]["interfaces"]
+            if ip not in interfaces:
+                interfaces.append(ip)
+        else:
+            self.aliases.setdefault(key, []).append(ip)
+
+    def update_inventory(self, info):
+        """Add or update device info in the inventory."""
+        hostname = info["hostname"]
+        key = short_hostname(hostname)
+
+        with self._lock:
+            if hostname not in self.device_inventory:
+                self.device_inventory[hostname] = {
+                    "hostname": hostname,
+                    "vendor": info.get("vendor", "Unknown"),
+                    "interfaces": [info.get("ip")] if info.get("ip") else [],
+                    "neighbors": [nb["hostname"] for nb in info.get("neighbors", [])],
+                    "username": self.username,
+                    "password": self.password
+                }
+            else:
+                ip = info.get("ip")
+                if ip and ip not in self.device_inventory[hostname]["interfaces"]:
+                    self.device_inventory[hostname]["interfaces"].append(ip)
+
+                for nb in info.get("neighbors", []):
+                    if nb["hostname"] not in self.device_inventory[hostname]["neighbors"]:
+                        self.device_inventory[hostname]["neighbors"].append(nb["hostname"])
+
+            self.hosts[key] = hostname
+            self.claims.pop(info.get("ip"), None)
+            for ip in self.aliases.pop(key, []):
+                if ip not in self.device_inventory[hostname]["interfaces"]:
+                    self.device_inventory[hostname]["interfaces"].append(ip)
+
+    # ----------------------------
+    # Workers
+    # ----------------------------
+    def scan(self, ip):
+        """Log into one device and record it. Runs on a worker thread."""
+        print(f"\n[SCAN] {ip}")
+        try:
+            with connect(ip, self.username, self.password) as conn:
+                info = collect_info(conn, ip)
+        except Exception as e:
+            print(f"[ERROR] Connection failed for {ip}: {e}")
+            return None
+
+        self.update_inventory(info)
+
+        hostname = info["hostname"]
+        print(f"[DISCOVERED] {hostname} - IPs: {self.device_inventory[hostname]['interfaces']}")
+        print(" → Neighbors:")
+        for nb in info["neighbors"]:
+            print(f"    {nb['hostname']} ({nb['ip']})")
+
+        return info
+
+    def walk(self, frontier):
+        """Drain the frontier breadth-first with at most `workers` SSH sessions in flight."""
+        frontier = deque(frontier)
+        pending = {}    # future → IP
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            while frontier or pending:
+                if self.job and self.job.cancelled:
+                    frontier.clear()  # let in-flight scans finish, start no new ones
+                while frontier and len(pending) < self.workers:
+                    ip = frontier.popleft()
+                    pending[pool.submit(self.scan, ip)] = ip
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    ip = pending.pop(fut)
+                    info = fut.result()
+                    if info is None:
+                        fallback = self.release(ip)
+                        if fallback:
+                            frontier.append(fallback)
+                        continue
+                    for nb in info["neighbors"]:
+                        if nb["ip"] and self.claim(nb["ip"], nb["hostname"]):
+                            frontier.append(nb["ip"])
+
+                if self.job:
+                    self.job.set_progress(
+                        devicesFound=len(self.device_inventory),
+                        queued=len(frontier) + len(pending),
+                    )
+
+    def discover(self, start_ip):
+        if self.claim(start_ip):
+            self.walk([start_ip])
+        return list(self.device_inventory.values())
+
+    # ----------------------------
+    # Incremental re-discovery
+    # ----------------------------
+    def seed(self, devices):
+        """Preload a previous inventory so known devices are not walked again."""
+        for d in devices:
+            key = inventory_key(d)
+            if not key:
+                continue
+            record = dict(d)
+            record["interfaces"] = list(d.get("interfaces") or ([d["ip"]] if d.get("ip") else []))
+            record["neighbors"] = list(d.get("neighbors", []))
+            self.device_inventory[key] = record
+            if key == d.get("hostname"):
+                self.hosts[short_hostname(key)] = key
+            self.visited.update(record["interfaces"])
+
+    def poll_neighbors(self, device):
+        """Re-read only the CDP table of a known device, trying each of its IPs."""
+        username = device.get("username", self.username)
+        password = device.get("password", self.password)
+        for ip in device["interfaces"]:
+            try:
+                with connect(ip, username, password) as conn:
+                    return parse_neighbors(conn.send_command("show cdp neighbors detail"))
+            except Exception as e:
+                print(f"[ERROR] CDP poll failed for {ip}: {e}")
+        return None
 
-    if hostname not in device_inventory:
-        device_inventory[hostname] = {
-            "hostname": hostname,
-            "vendor": info.get("vendor", "Unknown"),
-            "interfaces": [info.get("ip")] if info.get("ip") else [],
-            "neighbors": [nb["hostname"] for nb in info.get("neighbors", [])],
-            "username": USERNAME,
-            "password": PASSWORD
+    def refresh(self, start_ip=None):
+        """
+        Re-poll every known device's neighbor table and only walk into
+        neighbors that are not in the stored inventory yet.
+        Returns a change report (added / removed / changed / unreachable).
+        """
+        known = list(self.device_inventory.items())
+        before = set(self.device_inventory)
+        changed = set()
+        unreachable = []
+        frontier = []
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            polled = list(zip(known, pool.map(self.poll_neighbors, (r for _, r in known))))
+
+        for (hostname, record), neighbors in polled:
+            if neighbors is None:
+                unreachable.append(hostname)
+                continue
+
+            names = [nb["hostname"] for nb in neighbors]
+            if set(names) != set(record["neighbors"]):
+                record["neighbors"] = names
+                changed.add(hostname)
+
+            for nb in neighbors:
+                if not nb["ip"]:
+                    continue
+                owner = self.hosts.get(short_hostname(nb["hostname"]))
+                if owner is None:
+                    if self.claim(nb["ip"], nb["hostname"]):
+                        frontier.append(nb["ip"])
+                elif nb["ip"] not in self.device_inventory[owner]["interfaces"]:
+                    # Known device answering on a new address
+                    self.device_inventory[owner]["interfaces"].append(nb["ip"])
+                    self.visited.add(nb["ip"])
+                    changed.add(owner)
+
+        if start_ip and self.claim(start_ip):
+            frontier.append(start_ip)
+
+        self.walk(frontier)
+
+        # Unreachable devices nobody lists as a neighbor any more are gone.
+        # Devices added by hand (keyed by IP) were never discovered, so they stay.
+        referenced = {
+            short_hostname(nb)
+            for h, d in self.device_inventory.items() if h not in unreachable
+            for nb in d["neighbors"]
+        }
+        removed = [
+            h for h in unreachable
+            if h == self.device_inventory[h].get("hostname") and short_hostname(h) not in referenced
+        ]
+        for h in removed:
+            del self.device_inventory[h]
+
+        added = [h for h in self.device_inventory if h not in before]
+        return {
+            "added": added,
+            "removed": removed,
+            "changed": sorted(changed - set(removed)),
+            "unreachable": [h for h in unreachable if h not in removed],
         }
-    else:
-        ip = info.get("ip")
-        if ip and ip not in device_inventory[hostname]["interfaces"]:
-            device_inventory[hostname]["interfaces"].append(ip)
-
-        for nb in info.get("neighbors", []):
-            if nb["hostname"] not in device_inventory[hostname]["neighbors"]:
-                device_inventory[hostname]["neighbors"].append(nb["hostname"])
-
-
-def discover(ip):
-    """Recursive device discovery."""
-    if ip in visited:
-        return
-    visited.add(ip)
-
-    print(f"\n[SCAN] {ip}")
-    conn = connect(ip)
-    if conn is None:
-        return
-
-    info = collect_info(conn, ip)
-    update_inventory(info)
-
-    hostname = info["hostname"]
-    print(f"[DISCOVERED] {hostname} - IPs: {device_inventory[hostname]['interfaces']}")
-    print(" → Neighbors:")
-    for nb in info["neighbors"]:
-        print(f"    {nb['hostname']} ({nb['ip']})")
-
-    # Discover neighbors recursively
-    for nb in info["neighbors"]:
-        if nb["ip"]:
-            discover(nb["ip"])
 
-    conn.disconnect()
 
+def run_discovery_api(start_ip=None, workers=None, incremental=False, job=None):
+    """
+    API-style function for discovery; the result replaces the stored inventory.
 
-def run_discovery_api(start_ip):
-    """API-style function for discovery and JSON export."""
-    global visited, device_inventory
-    visited = set()
-    device_inventory = {}
+    With incremental=True the existing inventory is used as the starting
+    point and only devices whose CDP neighbors changed are walked.
+    When run as a background job, a cancelled run leaves the saved
+    inventory untouched.
+    """
+    run = DiscoveryRun(workers=workers or DISCOVERY_WORKERS, job=job)
 
     try:
-        discover(start_ip)
+        if incremental:
+            run.seed(load_inventory())
+            changes = run.refresh(start_ip)
+            final_list = list(run.device_inventory.values())
+        else:
+            final_list = run.discover(start_ip)
+            changes = {"added": [d["hostname"] for d in final_list]}
+
+        if job:
+            job.check_cancelled()
 
-        # Save inventory to JSON
-        final_list = list(device_inventory.values())
-        with open("network_inventory.json", "w") as f:
-            json.dump(final_list, f, indent=4)
+        save_inventory(final_list)
 
         return {
             "status": "success",
             "total_devices": len(final_list),
-            "all_devices": final_list
+            "new_devices": [run.device_inventory[h] for h in changes["added"]],
+            "all_devices": final_list,
+            **changes,
         }
 
     except Exception as e:
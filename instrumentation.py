@@ -0,0 +1,180 @@
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Latency buckets in seconds: sub-ms JSON loads up to multi-minute discoveries
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def _num(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+# ---------------------------------
+# Metric types (Prometheus text format)
+# ---------------------------------
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for key, value in items:
+            yield f"{self.name}{_labels(self.labelnames, key)} {_num(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}   # label values → [per-bucket counts..., +Inf count], sum
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][i] += 1
+            series[1] += value
+
+    def samples(self):
+        with self._lock:
+            items = sorted((k, (list(counts), total)) for k, (counts, total) in self._series.items())
+        for key, (counts, total) in items:
+            running = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                running += count
+                yield f"{self.name}_bucket{_labels(self.labelnames, key, [('le', _num(bound))])} {running}"
+            yield f"{self.name}_sum{_labels(self.labelnames, key)} {_num(total)}"
+            yield f"{self.name}_count{_labels(self.labelnames, key)} {running}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def counter(self, name, help, labelnames=()):
+        return self._metrics.setdefault(name, Counter(name, help, labelnames))
+
+    def histogram(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._metrics.setdefault(name, Histogram(name, help, labelnames, buckets))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+HTTP_LATENCY = REGISTRY.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route", ("method", "route", "status")
+)
+OP_LATENCY = REGISTRY.histogram(
+    "netops_operation_duration_seconds",
+    "Latency of backend operations (SSH phases, probes, inventory/JSON loads)", ("op", "source")
+)
+OP_ERRORS = REGISTRY.counter(
+    "netops_operation_errors_total", "Backend operations that raised", ("op", "source")
+)
+
+
+# ---------------------------------
+# Per-request profiling
+# ---------------------------------
+# When a profile is active in the current context, every timed() block also
+# adds to it; threads started by worker pools do not inherit it.
+
+_profile = ContextVar("netops_profile", default=None)
+
+
+def start_profile():
+    """Start collecting a timing breakdown for the current context."""
+    return _profile.set({})
+
+
+def current_profile():
+    """The breakdown collected so far: {op: {"count", "seconds"}}."""
+    return _profile.get() or {}
+
+
+def stop_profile(token):
+    """End the profile started with `token`; returns the breakdown."""
+    profile = _profile.get()
+    try:
+        _profile.reset(token)
+    except ValueError:
+        # ended from another context (e.g. a streamed response torn down later)
+        _profile.set(None)
+    return profile or {}
+
+
+def record(op, seconds, source="", error=False):
+    OP_LATENCY.observe(seconds, op=op, source=source)
+    if error:
+        OP_ERRORS.inc(op=op, source=source)
+    profile = _profile.get()
+    if profile is not None:
+        entry = profile.setdefault(op, {"count": 0, "seconds": 0.0})
+        entry["count"] += 1
+        entry["seconds"] += seconds
+
+
+@contextmanager
+def timed(op, source=""):
+    start = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        record(op, time.perf_counter() - start, source, error=True)
+        raise
+    record(op, time.perf_counter() - start, source)
+
+
+def server_timing(profile, total=None):
+    """Format a profile as a Server-Timing header value (durations in ms)."""
+    parts = [
+        f'{op};dur={entry["seconds"] * 1000:.1f};desc="{entry["count"]}x"'
+        for op, entry in sorted(profile.items())
+    ]
+    if total is not None:
+        parts.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(parts)
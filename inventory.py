@@ -1,60 +1,404 @@
+import csv
+import io
+import ipaddress
 import json
-from netmiko import ConnectHandler
+import os
+import threading
+
+from instrumentation import timed
+from utils.sqlite_store import SQLiteStore
 
 INVENTORY_FILE = "network_inventory.json"
+INVENTORY_DB = os.getenv("INVENTORY_DB", "network_inventory.db")
 
-def load_inventory():
+DEFAULT_USERNAME = "netkode"
+DEFAULT_PASSWORD = "netkode"
+
+BULK_MODES = ("create", "upsert", "update", "delete")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    id       INTEGER PRIMARY KEY AUTOINCREMENT,
+    hostname TEXT,
+    data     TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_devices_hostname ON devices(hostname);
+
+CREATE TABLE IF NOT EXISTS device_ips (
+    ip        TEXT PRIMARY KEY,
+    device_id INTEGER NOT NULL REFERENCES devices(id) ON DELETE CASCADE
+);
+CREATE INDEX IF NOT EXISTS idx_device_ips_device ON device_ips(device_id);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key   TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+INSERT OR IGNORE INTO meta (key, value) VALUES ('version', 0);
+"""
+
+
+def device_ips(device):
+    """Manually added devices carry `ip`, discovered ones carry `interfaces`."""
+    ips = list(device.get("interfaces") or [])
+    if device.get("ip") and device["ip"] not in ips:
+        ips.insert(0, device["ip"])
+    return ips
+
+
+class InventoryStore(SQLiteStore):
+    """
+    SQLite-backed inventory (WAL mode) with indexed lookups by IP and
+    hostname. Each device is stored as its original JSON record, so the
+    API keeps returning exactly what was saved. On first use an existing
+    network_inventory.json is imported.
+    """
+
+    pragmas = ("foreign_keys=ON",)
+
+    def __init__(self, path=INVENTORY_DB, json_file=INVENTORY_FILE):
+        super().__init__(path)
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        if json_file and not conn.execute("SELECT 1 FROM devices LIMIT 1").fetchone():
+            devices = _read_json_file(json_file)
+            if devices:
+                self.replace_all(devices)
+
+    def _before_commit(self, conn):
+        # Bumped with every committed write (any process), used for HTTP ETags
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'version'")
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def all(self):
+        rows = self._conn().execute("SELECT data FROM devices ORDER BY id")
+        return [json.loads(data) for (data,) in rows]
+
+    def version(self):
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'version'").fetchone()[0]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM devices").fetchone()[0]
+
+    def find_by_ip(self, ip):
+        row = self._conn().execute(
+            "SELECT d.data FROM device_ips i JOIN devices d ON d.id = i.device_id WHERE i.ip = ?",
+            (ip,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def find_by_hostname(self, hostname):
+        row = self._conn().execute(
+            "SELECT data FROM devices WHERE hostname = ? ORDER BY id LIMIT 1", (hostname,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    # ----------------------------
+    # Writes
+    # ----------------------------
+    def _device_id(self, conn, device):
+        """Existing row for a record: matched by any of its IPs, or by hostname if it has none."""
+        ips = device_ips(device)
+        if ips:
+            row = conn.execute(
+                f"SELECT device_id FROM device_ips WHERE ip IN ({','.join('?' * len(ips))}) LIMIT 1",
+                ips
+            ).fetchone()
+            if row:
+                return row[0]
+        elif device.get("hostname"):
+            row = conn.execute(
+                "SELECT id FROM devices WHERE hostname = ? LIMIT 1", (device["hostname"],)
+            ).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def _insert(self, conn, device):
+        cur = conn.execute(
+            "INSERT INTO devices (hostname, data) VALUES (?, ?)",
+            (device.get("hostname"), json.dumps(device))
+        )
+        self._claim_ips(conn, cur.lastrowid, device)
+        return cur.lastrowid
+
+    def _update(self, conn, device_id, device):
+        conn.execute(
+            "UPDATE devices SET hostname = ?, data = ? WHERE id = ?",
+            (device.get("hostname"), json.dumps(device), device_id)
+        )
+        conn.execute("DELETE FROM device_ips WHERE device_id = ?", (device_id,))
+        self._claim_ips(conn, device_id, device)
+
+    def _claim_ips(self, conn, device_id, device):
+        # An IP already owned by another device is never taken over
+        conn.executemany(
+            "INSERT OR IGNORE INTO device_ips (ip, device_id) VALUES (?, ?)",
+            [(ip, device_id) for ip in device_ips(device)]
+        )
+
+    def _ip_conflicts(self, conn, device_id, device):
+        """IPs of the record that already belong to a device other than device_id."""
+        ips = device_ips(device)
+        if not ips:
+            return []
+        rows = conn.execute(
+            f"SELECT ip FROM device_ips WHERE ip IN ({','.join('?' * len(ips))}) AND device_id != ?",
+            ips + [device_id if device_id is not None else -1]
+        )
+        return [ip for (ip,) in rows]
+
+    def add(self, device):
+        """Insert unless one of the device's IPs is already known. Returns False on duplicate."""
+        with self._write() as conn:
+            if self._device_id(conn, device) is not None:
+                return False
+            self._insert(conn, device)
+            return True
+
+    def upsert(self, device):
+        """
+        Atomically insert or replace the record owning any of the device's IPs.
+        Returns None if some of its IPs belong to yet another device.
+        """
+        with self._write() as conn:
+            device_id = self._device_id(conn, device)
+            if device_id is None:
+                self._insert(conn, device)
+                return "created"
+            if self._ip_conflicts(conn, device_id, device):
+                return None
+            self._update(conn, device_id, device)
+            return "updated"
+
+    def delete_by_ip(self, ip):
+        with self._write() as conn:
+            row = conn.execute("SELECT device_id FROM device_ips WHERE ip = ?", (ip,)).fetchone()
+            if not row:
+                return False
+            conn.execute("DELETE FROM devices WHERE id = ?", (row[0],))
+            return True
+
+    def bulk_apply(self, rows, mode="create", atomic=False):
+        """
+        Apply many validated rows in a single transaction.
+
+        rows: [(index, device, error)] where device is None and error is set
+        for rows that already failed validation. Returns one result dict per row, in input order.
+        With atomic=True any failing row rolls the whole batch back.
+        """
+        results = []
+        try:
+            with self._write() as conn:
+                for index, device, error in rows:
+                    results.append(self._apply_row(conn, index, device, error, mode))
+                if atomic and any(r["status"] == "error" for r in results):
+                    raise _Rollback()
+        except _Rollback:
+            for r in results:
+                if r["status"] != "error":
+                    r["status"] = "rolled-back"
+        return results
+
+    def _apply_row(self, conn, index, device, error, mode):
+        result = {"row": index, "ip": (device or {}).get("ip")}
+        if error:
+            return {**result, "status": "error", "error": error}
+
+        device_id = self._device_id(conn, device)
+        if mode == "delete":
+            if device_id is None:
+                return {**result, "status": "error", "error": "Device not found"}
+            conn.execute("DELETE FROM devices WHERE id = ?", (device_id,))
+            return {**result, "status": "deleted"}
+        if device_id is None:
+            if mode == "update":
+                return {**result, "status": "error", "error": "Device not found"}
+            self._insert(conn, device)
+            return {**result, "status": "created"}
+        if mode == "create":
+            return {**result, "status": "error", "error": "Device already exists"}
+        if mode == "update":
+            # Partial update: merge onto the stored record
+            (data,) = conn.execute("SELECT data FROM devices WHERE id = ?", (device_id,)).fetchone()
+            device = {**json.loads(data), **device}
+        conflicts = self._ip_conflicts(conn, device_id, device)
+        if conflicts:
+            return {**result, "status": "error", "error": f"IP already assigned to another device: {', '.join(conflicts)}"}
+        self._update(conn, device_id, device)
+        return {**result, "status": "updated"}
+
+    def replace_all(self, devices):
+        """Bulk import: swap the whole inventory in one transaction."""
+        with self._write() as conn:
+            conn.execute("DELETE FROM device_ips")
+            conn.execute("DELETE FROM devices")
+            for d in devices:
+                self._insert(conn, d)
+
+    def export_json(self, path=INVENTORY_FILE):
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.all(), f, indent=4)
+        os.replace(tmp, path)
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _read_json_file(path):
     try:
-        with open(INVENTORY_FILE, "r") as f:
+        with open(path, "r") as f:
             data = f.read().strip()
+            return json.loads(data) if data else []
+    except (FileNotFoundError, json.JSONDecodeError):
+        return []
 
-            # If file is empty, return empty list
-            if not data:
-                return []
 
-            return json.loads(data)
+_store = None
+_store_lock = threading.Lock()
 
-    except FileNotFoundError:
-        # If file doesn’t exist, create it and return empty list
-        save_inventory([])
-        return []
 
-    except json.JSONDecodeError:
-        # File corrupted → reset
-        save_inventory([])
-        return []
+def get_store():
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = InventoryStore()
+    return _store
+
+
+# ---------------------------------
+# Module-level API
+# ---------------------------------
+
+def load_inventory():
+    with timed("inventory_load"):
+        return get_store().all()
+
+
+def inventory_version():
+    """Changes whenever the inventory is written."""
+    return get_store().version()
 
 
 def save_inventory(devices):
-    with open(INVENTORY_FILE, "w") as f:
-        json.dump(devices, f, indent=4)
+    get_store().replace_all(devices)
+
+
+def export_inventory(path=INVENTORY_FILE):
+    """Write the store back out in the legacy network_inventory.json format."""
+    get_store().export_json(path)
+
+
+def find_device(ip):
+    return get_store().find_by_ip(ip)
+
+
+def find_device_by_hostname(hostname):
+    return get_store().find_by_hostname(hostname)
 
 
 def add_device_to_inventory(ip, hostname, username, password):
-    devices = load_inventory()
-    
-    # Check duplicates
-    for d in devices:
-        if d.get("ip") == ip:
-            return {"error": "Device already exists"}
-
-    devices.append({
+    store = get_store()
+
+    added = store.add({
         "ip": ip,
         "hostname": hostname,
         "username": username,
         "password": password
     })
+    if not added:
+        return {"error": "Device already exists"}
 
-    save_inventory(devices)
-    return {"message": "Device added", "count": len(devices)}
+    return {"message": "Device added", "count": store.count()}
 
 
 def delete_device_from_inventory(ip):
-    devices = load_inventory()
-    new_list = [d for d in devices if d.get("ip") != ip]
+    store = get_store()
 
-    if len(devices) == len(new_list):
+    if not store.delete_by_ip(ip):
         return {"error": "Device not found"}
 
-    save_inventory(new_list)
-    return {"message": f"Device {ip} deleted", "count": len(new_list)}
+    return {"message": f"Device {ip} deleted", "count": store.count()}
+
+
+# ---------------------------------
+# Bulk import / update / delete
+# ---------------------------------
+
+def rows_from_csv(text):
+    """CSV with a header row (ip,hostname,username,password,vendor,interfaces)."""
+    rows = []
+    for row in csv.DictReader(io.StringIO(text)):
+        row = {k.strip(): (v or "").strip() for k, v in row.items() if k}
+        if row.get("interfaces"):
+            row["interfaces"] = row["interfaces"].replace(";", " ").split()
+        rows.append({k: v for k, v in row.items() if v != ""})
+    return rows
+
+
+def validate_device_row(row, mode="create"):
+    """Return (device, error). Delete rows only need an IP."""
+    if not isinstance(row, dict):
+        return None, "Row must be an object"
+
+    ip = row.get("ip")
+    if not ip and row.get("interfaces") and mode != "create":
+        ip = row["interfaces"][0]
+    if not ip:
+        return None, "IP required"
+    for addr in [ip] + list(row.get("interfaces") or []):
+        # ip_address() also takes integers; only dotted/colon strings are stored
+        if not isinstance(addr, str):
+            return None, f"Invalid IP address: {addr}"
+        try:
+            ipaddress.ip_address(addr)
+        except ValueError:
+            return None, f"Invalid IP address: {addr}"
+
+    if mode == "delete":
+        return {"ip": ip}, None
+
+    device = dict(row)
+    device["ip"] = ip
+    if mode != "update":
+        device.setdefault("hostname", "unknown")
+        device.setdefault("username", DEFAULT_USERNAME)
+        device.setdefault("password", DEFAULT_PASSWORD)
+    return device, None
+
+
+def bulk_inventory(rows, mode="create", atomic=False):
+    """Validate every row, then apply the valid ones in one transaction."""
+    if mode not in BULK_MODES:
+        raise ValueError(f"mode must be one of {', '.join(BULK_MODES)}")
+
+    store = get_store()
+    checked = []
+    for i, row in enumerate(rows):
+        device, error = validate_device_row(row, mode)
+        if error:
+            device = {"ip": row.get("ip")} if isinstance(row, dict) else None
+        checked.append((i, device, error))
+
+    results = store.bulk_apply(checked, mode, atomic)
+    failed = sum(1 for r in results if r["status"] == "error")
+    applied = sum(1 for r in results if r["status"] not in ("error", "rolled-back"))
+
+    return {
+        "mode": mode,
+        "total": len(results),
+        "applied": applied,
+        "failed": failed,
+        "count": store.count(),
+        "results": results,
+    }
+
+
+if __name__ == "__main__":
+    export_inventory()
@@ -0,0 +1,157 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Job subsystem tuning (override via .env / environment)
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "8"))
+JOB_RETENTION = int(os.getenv("JOB_RETENTION", "200"))     # finished jobs kept
+JOB_RESULT_TTL = float(os.getenv("JOB_RESULT_TTL", "3600"))  # seconds after finishing
+
+FINISHED = ("succeeded", "failed", "cancelled")
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class JobCancelled(Exception):
+    """Raised by Job.check_cancelled() to unwind a job that was cancelled."""
+
+
+class Job:
+    def __init__(self, kind, job_id=None):
+        self.id = job_id or uuid.uuid4().hex[:12]
+        self.kind = kind
+        self.status = "queued"
+        self.progress = {}
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self._finished = None  # monotonic, for TTL eviction
+        self._cancel = threading.Event()
+        self._future = None
+        self._on_cancel = None  # called if the job is cancelled before it starts
+
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self):
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def set_progress(self, **progress):
+        self.progress = {**self.progress, **progress}
+
+    def to_dict(self, include_result=True):
+        out = {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "progress": self.progress,
+            "error": self.error,
+            "createdAt": self.created_at,
+            "startedAt": self.started_at,
+            "finishedAt": self.finished_at,
+        }
+        if include_result:
+            out["result"] = self.result
+        return out
+
+
+class JobManager:
+    """
+    Runs long network operations on a bounded thread pool so HTTP handlers
+    can return a job ID right away. Finished jobs are kept for
+    JOB_RESULT_TTL seconds, and at most JOB_RETENTION of them at a time.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, retention=JOB_RETENTION, ttl=JOB_RESULT_TTL):
+        self.retention = retention
+        self.ttl = ttl
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="job")
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, fn, *args, job_id=None, on_cancel=None, **kwargs):
+        """
+        Queue fn(job, *args, **kwargs); the job object is passed first.
+        on_cancel(job) runs instead of fn if the job is cancelled while queued.
+        """
+        job = Job(kind, job_id)
+        job._on_cancel = on_cancel
+        with self._lock:
+            self._evict_locked()
+            self._jobs[job.id] = job
+        job._future = self._executor.submit(self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            self._cancel_queued(job)
+            return
+        job.status = "running"
+        job.started_at = _now()
+        try:
+            job.result = fn(job, *args, **kwargs)
+            self._finish(job, "cancelled" if job.cancelled else "succeeded")
+        except JobCancelled:
+            self._finish(job, "cancelled")
+        except Exception as e:
+            job.error = str(e)
+            self._finish(job, "failed")
+
+    def _finish(self, job, status):
+        job.status = status
+        job.finished_at = _now()
+        job._finished = time.monotonic()
+
+    def get(self, job_id):
+        with self._lock:
+            self._evict_locked()
+            return self._jobs.get(job_id)
+
+    def list(self, kind=None):
+        with self._lock:
+            self._evict_locked()
+            return [j for j in self._jobs.values() if kind is None or j.kind == kind]
+
+    def cancel(self, job_id):
+        """Queued jobs never start; running jobs stop at their next checkpoint."""
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED:
+            return job
+        job._cancel.set()
+        if job._future is not None and job._future.cancel():
+            self._cancel_queued(job)
+        return job
+
+    def _cancel_queued(self, job):
+        self._finish(job, "cancelled")
+        if job._on_cancel is not None:
+            try:
+                job._on_cancel(job)
+            except Exception as e:
+                print(f"[ERROR] Cancel hook for job {job.id} failed: {e}")
+
+    def _evict_locked(self):
+        now = time.monotonic()
+        finished = [j for j in self._jobs.values() if j._finished is not None]
+        expired = {j.id for j in finished if now - j._finished > self.ttl}
+        overflow = len(finished) - len(expired) - self.retention
+        if overflow > 0:
+            # Oldest first: the dict is in submission order
+            kept = [j for j in finished if j.id not in expired]
+            expired.update(j.id for j in kept[:overflow])
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# Shared process-wide job manager
+job_manager = JobManager()
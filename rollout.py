@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config_push import push_config
+from jobs import job_manager
+
+# Rollout defaults (override via .env / environment or per request)
+ROLLOUT_CANARY_SIZE = int(os.getenv("ROLLOUT_CANARY_SIZE", "1"))
+ROLLOUT_WAVE_SIZE = int(os.getenv("ROLLOUT_WAVE_SIZE", "20"))
+ROLLOUT_PARALLELISM = int(os.getenv("ROLLOUT_PARALLELISM", "10"))
+ROLLOUT_MAX_FAILURE_RATE = float(os.getenv("ROLLOUT_MAX_FAILURE_RATE", "0.1"))
+ROLLOUT_RETENTION = int(os.getenv("ROLLOUT_RETENTION", "100"))
+
+
+def _now():
+    return datetime.utcnow().isoformat() + "Z"
+
+
+class Rollout:
+    """
+    Staged config push: a canary batch first, then fixed-size waves.
+    After every batch the failure rate so far is checked against
+    max_failure_rate and the remaining devices are skipped if it is exceeded.
+    """
+
+    def __init__(self, targets, commands, canary_size=ROLLOUT_CANARY_SIZE,
+                 wave_size=ROLLOUT_WAVE_SIZE, parallelism=ROLLOUT_PARALLELISM,
+                 max_failure_rate=ROLLOUT_MAX_FAILURE_RATE):
+        self.id = uuid.uuid4().hex[:12]
+        self.targets = targets
+        self.commands = commands
+        self.parallelism = max(1, parallelism)
+        self.max_failure_rate = max_failure_rate
+
+        self.canary_size = canary_size = max(0, min(canary_size, len(targets)))
+        wave_size = max(1, wave_size)
+        rest = targets[canary_size:]
+        self.waves = ([targets[:canary_size]] if canary_size else []) + \
+            [rest[i:i + wave_size] for i in range(0, len(rest), wave_size)]
+
+        self.status = "pending"
+        self.reason = None
+        self.current_wave = 0
+        self.results = {}  # ip → per-device result
+        self.created_at = _now()
+        self.finished_at = None
+        self.started = None     # epoch seconds, for listeners
+        self.ended = None
+        self._abort = threading.Event()
+        self._lock = threading.Lock()
+
+    def abort(self, reason="aborted by user"):
+        self.reason = self.reason or reason
+        self._abort.set()
+
+    def _push(self, target):
+        result = push_config(
+            ip=target["ip"],
+            username=target.get("username"),
+            password=target.get("password"),
+            commands=self.commands
+        )
+        entry = {
+            "ip": target["ip"],
+            "hostname": target.get("hostname"),
+            "status": result["status"],
+            "output": result.get("output"),
+            "error": result.get("error"),
+            "finishedAt": _now(),
+        }
+        with self._lock:
+            self.results[target["ip"]] = entry
+        return entry
+
+    def _counts(self):
+        with self._lock:
+            done = len(self.results)
+            failed = sum(1 for r in self.results.values() if r["status"] != "success")
+        return done, failed
+
+    def run(self, job=None):
+        self.status = "running"
+        self.started = time.time()
+        with ThreadPoolExecutor(max_workers=self.parallelism) as pool:
+            for i, wave in enumerate(self.waves):
+                if job and job.cancelled:
+                    self.abort("cancelled")
+                if self._abort.is_set():
+                    break
+                self.current_wave = i + 1
+                list(pool.map(self._push, wave))
+
+                done, failed = self._counts()
+                if job:
+                    job.set_progress(completed=done, failed=failed, total=len(self.targets),
+                                     wave=self.current_wave, totalWaves=len(self.waves))
+                if done and failed / done > self.max_failure_rate:
+                    stage = "canary" if i == 0 and self.canary_size and len(self.waves) > 1 else f"wave {i + 1}"
+                    self.abort(f"failure rate {failed}/{done} exceeded "
+                               f"{self.max_failure_rate:.0%} after {stage}")
+
+        return self._finish()
+
+    def cancel_queued(self, job=None):
+        """Close out a rollout whose job was cancelled before run() started."""
+        self.abort("cancelled")
+        return self._finish()
+
+    def _finish(self):
+        done, failed = self._counts()
+        if self._abort.is_set():
+            self.status = "aborted"
+        else:
+            self.status = "failed" if failed else "succeeded"
+        self.finished_at = _now()
+        self.ended = time.time()
+        if self.started is None:
+            self.started = self.ended
+        for fn in _listeners:
+            try:
+                fn(self)
+            except Exception as e:
+                print(f"[ERROR] Rollout listener failed: {e}")
+        return self.to_dict()
+
+    def to_dict(self):
+        done, failed = self._counts()
+        with self._lock:
+            results = list(self.results.values())
+        return {
+            "id": self.id,
+            "status": self.status,
+            "reason": self.reason,
+            "totalDevices": len(self.targets),
+            "completed": done,
+            "succeeded": done - failed,
+            "failed": failed,
+            "skipped": len(self.targets) - done if self.finished_at else 0,
+            "currentWave": self.current_wave,
+            "totalWaves": len(self.waves),
+            "waveSizes": [len(w) for w in self.waves],
+            "maxFailureRate": self.max_failure_rate,
+            "createdAt": self.created_at,
+            "finishedAt": self.finished_at,
+            "results": results,
+        }
+
+
+# ---------------------------------
+# Registry
+# ---------------------------------
+_rollouts = OrderedDict()
+_registry_lock = threading.Lock()
+_listeners = []
+
+
+def subscribe(fn):
+    """Call fn(rollout) whenever a rollout finishes."""
+    _listeners.append(fn)
+
+
+def start_rollout(targets, commands, **options):
+    rollout = Rollout(targets, commands, **options)
+
+    with _registry_lock:
+        _rollouts[rollout.id] = rollout
+        # Drop the oldest finished rollouts beyond the retention limit
+        for rid in [r for r, ro in _rollouts.items() if ro.finished_at]:
+            if len(_rollouts) <= ROLLOUT_RETENTION:
+                break
+            del _rollouts[rid]
+
+    # Runs on the shared job pool; the job shares the rollout's ID
+    job_manager.submit("config-rollout", rollout.run, job_id=rollout.id,
+                       on_cancel=rollout.cancel_queued)
+    return rollout
+
+
+def get_rollout(rollout_id):
+    with _registry_lock:
+        return _rollouts.get(rollout_id)
@@ -1,6 +1,9 @@
 import requests
 import os
+import threading
+from datetime import datetime
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 # Load environment variables from .env
 load_dotenv()
@@ -8,18 +11,113 @@ load_dotenv()
 SERVICENOW_INSTANCE = os.getenv("SERVICENOW_INSTANCE")
 SERVICENOW_USERNAME = os.getenv("SERVICENOW_USERNAME")
 SERVICENOW_PASSWORD = os.getenv("SERVICENOW_PASSWORD")
+SERVICENOW_PAGE_SIZE = int(os.getenv("SERVICENOW_PAGE_SIZE", "100"))
+SERVICENOW_TIMEOUT = float(os.getenv("SERVICENOW_TIMEOUT", "15"))
+
+INCIDENT_FIELDS = "sys_id,number,short_description,priority,state,category,sys_created_on,sys_updated_on"
+# Raw (UTC, "YYYY-MM-DD HH:MM:SS") sys_updated_on, kept next to the display values
+UPDATED_RAW_FIELD = "sys_updated_on_utc"
+RAW_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def parse_raw_datetime(value):
+    """Parse a raw Table API date-time value (always UTC); None if it is not one."""
+    try:
+        return datetime.strptime(value, RAW_FORMAT)
+    except (TypeError, ValueError):
+        return None
+
+
+def _flatten(record):
+    """
+    sysparm_display_value=all returns {"display_value", "value"} per field.
+    Keep the display values (what the dashboard shows) plus the raw UTC
+    sys_updated_on, which is what incremental syncs must compare and query.
+    """
+    out = {}
+    for field, value in record.items():
+        out[field] = value.get("display_value") if isinstance(value, dict) else value
+    updated = record.get("sys_updated_on")
+    if isinstance(updated, dict):
+        out[UPDATED_RAW_FIELD] = updated.get("value")
+    return out
+
+
+class ServiceNowClient:
+    """
+    Incident Table API client on one pooled, authenticated session.
+    `session` can be injected (e.g. pointing at a local mock instance).
+    """
+
+    def __init__(self, instance=None, username=None, password=None,
+                 session=None, page_size=SERVICENOW_PAGE_SIZE, timeout=SERVICENOW_TIMEOUT):
+        self.instance = (instance or "").rstrip("/")
+        self.page_size = page_size
+        self.timeout = timeout
+        if session is None:
+            session = requests.Session()
+            session.mount("https://", HTTPAdapter(pool_maxsize=10, max_retries=2))
+            session.mount("http://", HTTPAdapter(pool_maxsize=10, max_retries=2))
+            session.headers["Accept"] = "application/json"
+            if username:
+                session.auth = (username, password)
+        self.session = session
+
+    def _get(self, path, params):
+        if not self.instance:
+            raise ValueError("ServiceNow instance URL is missing!")
+        response = self.session.get(f"{self.instance}{path}", params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json().get("result", [])
+
+    def fetch_incidents(self, updated_since=None):
+        """
+        All incidents (or those updated at/after `updated_since`, a UTC
+        datetime), oldest update first, paging through the Table API with
+        sysparm_offset.
+        """
+        query = "ORDERBYsys_updated_on"
+        if updated_since:
+            day, clock = updated_since.strftime(RAW_FORMAT).split(" ", 1)
+            query = f"sys_updated_on>=javascript:gs.dateGenerate('{day}','{clock}')^{query}"
+
+        incidents = []
+        offset = 0
+        while True:
+            page = self._get("/api/now/table/incident", {
+                "sysparm_display_value": "all",
+                "sysparm_exclude_reference_link": "true",
+                "sysparm_fields": INCIDENT_FIELDS,
+                "sysparm_query": query,
+                "sysparm_limit": str(self.page_size),
+                "sysparm_offset": str(offset),
+            })
+            incidents.extend(_flatten(r) for r in page)
+            if len(page) < self.page_size:
+                return incidents
+            offset += len(page)
+
+    def count_incidents(self, query=None):
+        """Server-side count via the Aggregate API (no records transferred)."""
+        params = {"sysparm_count": "true"}
+        if query:
+            params["sysparm_query"] = query
+        result = self._get("/api/now/stats/incident", params)
+        return int(result["stats"]["count"])
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ServiceNowClient(SERVICENOW_INSTANCE, SERVICENOW_USERNAME, SERVICENOW_PASSWORD)
+    return _client
+
 
 def get_incidents():
-    if not SERVICENOW_INSTANCE:
-        raise ValueError("ServiceNow instance URL is missing!")
-    
-    url = f"{SERVICENOW_INSTANCE}/api/now/table/incident"
-    params = {
-        "sysparm_display_value": "true",
-        "sysparm_limit": "20",
-        "sysparm_fields": "number,short_description,priority,state,category,sys_created_on"
-    }
-
-    response = requests.get(url, auth=(SERVICENOW_USERNAME, SERVICENOW_PASSWORD), params=params)
-    response.raise_for_status() 
-    return response.json().get("result", [])
+    return get_client().fetch_incidents()
@@ -0,0 +1,227 @@
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from netmiko import ConnectHandler
+
+from instrumentation import timed
+
+# Pool tuning (override via .env / environment)
+SSH_IDLE_TIMEOUT = float(os.getenv("SSH_IDLE_TIMEOUT", "300"))
+SSH_MAX_SESSIONS = int(os.getenv("SSH_MAX_SESSIONS", "2"))
+SSH_ACQUIRE_TIMEOUT = float(os.getenv("SSH_ACQUIRE_TIMEOUT", "60"))
+
+
+def _fingerprint(password):
+    return hashlib.sha256((password or "").encode()).hexdigest()
+
+
+class _Session:
+    def __init__(self, key, secret, conn):
+        self.key = key
+        self.secret = secret
+        self.conn = conn
+        self.last_used = time.monotonic()
+
+    def close(self):
+        try:
+            self.conn.disconnect()
+        except Exception:
+            pass
+
+
+class _TimedConnection:
+    """Netmiko connection proxy that times send_command / send_config_set."""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def send_command(self, *args, **kwargs):
+        with timed("ssh_send_command"):
+            return self._conn.send_command(*args, **kwargs)
+
+    def send_config_set(self, *args, **kwargs):
+        with timed("ssh_send_config_set"):
+            return self._conn.send_config_set(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+
+class SSHSessionPool:
+    """
+    Keeps enabled netmiko sessions warm between calls.
+
+    Sessions are keyed by (host, username, device_type). A session is only
+    handed out to callers presenting the same password it was opened with,
+    so a warm session never bypasses authentication.
+    """
+
+    def __init__(self, idle_timeout=SSH_IDLE_TIMEOUT, max_sessions=SSH_MAX_SESSIONS,
+                 acquire_timeout=SSH_ACQUIRE_TIMEOUT):
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max(1, max_sessions)
+        self.acquire_timeout = acquire_timeout
+
+        self._cond = threading.Condition()
+        self._idle = {}   # key → [idle _Session]
+        self._open = {}   # key → number of sessions open (idle + in use)
+        self._reaper = None
+
+    # ----------------------------
+    # Checkout / checkin
+    # ----------------------------
+    def acquire(self, host, username, password, device_type="cisco_ios", **options):
+        key = (host, username, device_type)
+        secret = _fingerprint(password)
+        deadline = time.monotonic() + self.acquire_timeout
+        self._start_reaper()
+
+        while True:
+            stale = []
+            with self._cond:
+                while True:
+                    stale += self._expire_locked()
+                    idle = self._idle.get(key, [])
+                    session = next((s for s in reversed(idle) if s.secret == secret), None)
+                    if session:
+                        idle.remove(session)
+                        break
+                    if self._open.get(key, 0) < self.max_sessions:
+                        self._open[key] = self._open.get(key, 0) + 1
+                        break
+                    if idle:
+                        # Full, but an idle session for other credentials can make room
+                        stale.append(idle.pop(0))
+                        self._open[key] -= 1
+                        continue
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise TimeoutError(f"No SSH session available for {host}")
+                    self._cond.wait(remaining)
+
+            for s in stale:
+                s.close()
+
+            if session is None:
+                return self._connect(key, secret, password, options)
+            if self._healthy(session):
+                return session
+            # Dead session: drop it and try again (it still counts as open)
+            session.close()
+            with self._cond:
+                self._open[key] -= 1
+                self._cond.notify_all()
+
+    def _connect(self, key, secret, password, options):
+        host, username, device_type = key
+        try:
+            with timed("ssh_connect", device_type):
+                conn = ConnectHandler(
+                    device_type=device_type,
+                    host=host,
+                    username=username,
+                    password=password,
+                    **options
+                )
+            with timed("ssh_enable"):
+                conn.enable()
+        except Exception:
+            with self._cond:
+                self._open[key] -= 1
+                self._cond.notify_all()
+            raise
+        return _Session(key, secret, conn)
+
+    def _healthy(self, session):
+        try:
+            return session.conn.is_alive()
+        except Exception:
+            return False
+
+    def release(self, session, healthy=True):
+        if not healthy:
+            session.close()
+        with self._cond:
+            if healthy:
+                session.last_used = time.monotonic()
+                self._idle.setdefault(session.key, []).append(session)
+            else:
+                self._open[session.key] -= 1
+            self._cond.notify_all()
+
+    @contextmanager
+    def session(self, host, username, password, device_type="cisco_ios", **options):
+        """Borrow an enabled connection; it goes back to the pool unless the block raised."""
+        s = self.acquire(host, username, password, device_type, **options)
+        try:
+            yield _TimedConnection(s.conn)
+        except BaseException:
+            self.release(s, healthy=False)
+            raise
+        self.release(s)
+
+    # ----------------------------
+    # Eviction
+    # ----------------------------
+    def _expire_locked(self):
+        now = time.monotonic()
+        expired = []
+        for key, idle in self._idle.items():
+            keep = []
+            for s in idle:
+                (expired if now - s.last_used > self.idle_timeout else keep).append(s)
+            idle[:] = keep
+        for s in expired:
+            self._open[s.key] -= 1
+        return expired
+
+    def evict_idle(self):
+        with self._cond:
+            expired = self._expire_locked()
+            self._cond.notify_all()
+        for s in expired:
+            s.close()
+        return len(expired)
+
+    def close_all(self):
+        with self._cond:
+            sessions = [s for idle in self._idle.values() for s in idle]
+            for s in sessions:
+                self._open[s.key] -= 1
+            self._idle.clear()
+            self._cond.notify_all()
+        for s in sessions:
+            s.close()
+
+    def _start_reaper(self):
+        if self._reaper is not None:
+            return
+        with self._cond:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(target=self._reap, name="ssh-pool-reaper", daemon=True)
+            self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(1.0, self.idle_timeout / 2))
+            self.evict_idle()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "open": sum(self._open.values()),
+                "idle": sum(len(v) for v in self._idle.values()),
+                "devices": len([k for k, v in self._open.items() if v]),
+            }
+
+
+# Shared process-wide pool
+pool = SSHSessionPool()
+
+
+def ssh_session(host, username, password, device_type="cisco_ios", **options):
+    return pool.session(host, username, password, device_type, **options)
@@ -1,42 +1,207 @@
-import json
+import asyncio
+import os
+import shutil
+import socket
+import struct
 import subprocess
+import time
+
+from instrumentation import record, timed
+from inventory import load_inventory
+
+# Sweep tuning (override via .env / environment)
+STATUS_CONCURRENCY = int(os.getenv("STATUS_CONCURRENCY", "256"))
+STATUS_TIMEOUT = float(os.getenv("STATUS_TIMEOUT", "1"))
+STATUS_PROBE = os.getenv("STATUS_PROBE", "auto")  # auto | icmp | ping | tcp
+STATUS_TCP_PORT = int(os.getenv("STATUS_TCP_PORT", "22"))
+
 
 def ping_ip(ip, count=1, timeout=1):
     """Ping single IP from host system"""
     try:
-        result = subprocess.run(
-            ["ping", "-c", str(count), "-W", str(timeout), ip],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True
-        )
+        with timed("ping"):
+            result = subprocess.run(
+                ["ping", "-c", str(count), "-W", str(timeout), ip],
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True
+            )
         return result.returncode == 0
     except:
         return False
 
 
-def get_device_status(inventory_file):
-    with open(inventory_file, "r") as f:
-        devices = json.load(f)
+# ---------------------------------
+# Async probers
+# ---------------------------------
+
+def _icmp_checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def icmp_socket_available():
+    """Unprivileged ICMP (ping) sockets need net.ipv4.ping_group_range to include us."""
+    try:
+        socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP).close()
+        return True
+    except OSError:
+        return False
+
+
+async def async_icmp_probe(ip, timeout=STATUS_TIMEOUT):
+    """In-process ICMP echo over an unprivileged datagram socket."""
+    loop = asyncio.get_running_loop()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+    sock.setblocking(False)
+    try:
+        header = struct.pack("!BBHHH", 8, 0, 0, 0, 1)
+        payload = b"netops-status"
+        packet = struct.pack("!BBHHH", 8, 0, _icmp_checksum(header + payload), 0, 1) + payload
+        sock.connect((ip, 0))
+        await loop.sock_sendall(sock, packet)
+
+        deadline = loop.time() + timeout
+        while True:
+            data = await asyncio.wait_for(loop.sock_recv(sock, 1024), deadline - loop.time())
+            if data and data[0] == 0:  # echo reply
+                return True
+    except (OSError, asyncio.TimeoutError):
+        return False
+    finally:
+        sock.close()
+
+
+async def async_ping_ip(ip, timeout=STATUS_TIMEOUT):
+    """
+    Same check as ping_ip() but without blocking the event loop. If ping
+    cannot be spawned (missing binary, fd/process limits), the host is
+    checked with the TCP probe instead.
+    """
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            "ping", "-c", "1", "-W", str(max(1, int(timeout))), ip,
+            stdout=asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+    except OSError:
+        return await async_tcp_probe(ip, timeout)
+    try:
+        return await asyncio.wait_for(proc.wait(), timeout + 1) == 0
+    except asyncio.TimeoutError:
+        return False
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+
+
+async def async_tcp_probe(ip, timeout=STATUS_TIMEOUT, port=STATUS_TCP_PORT):
+    """TCP connect to the management port. A refusal still proves the host is up."""
+    try:
+        _, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), timeout)
+    except ConnectionRefusedError:
+        return True
+    except (OSError, asyncio.TimeoutError):
+        return False
+    writer.close()
+    return True
+
+
+PROBES = {
+    "icmp": async_icmp_probe,
+    "ping": async_ping_ip,
+    "tcp": async_tcp_probe,
+}
+
+
+def resolve_probe(method=None):
+    """Pick the requested prober, falling back to whatever this host supports."""
+    method = method or STATUS_PROBE
+    if method == "auto":
+        if icmp_socket_available():
+            return "icmp"
+        if shutil.which("ping"):
+            return "ping"
+        return "tcp"
+    if method == "icmp" and not icmp_socket_available():
+        return resolve_probe("auto")
+    if method == "ping" and not shutil.which("ping"):
+        return "tcp"
+    if method not in PROBES:
+        raise ValueError(f"Unknown probe method: {method}")
+    return method
+
 
-    status_result = {}
+# ---------------------------------
+# Sweep engine
+# ---------------------------------
 
-    for device in devices:
-        hostname = device.get("hostname")
-        interfaces = device.get("interfaces", [])
+async def _probe(ip, probe, sem, timeout):
+    async with sem:
+        start = time.perf_counter()
+        ok = await probe(ip, timeout)
+        elapsed = time.perf_counter() - start
+        record("probe", elapsed, probe.__name__)
+        latency = round(elapsed * 1000, 2)
+        return ip, latency if ok else None
 
-        device_status = "OFF"
 
-        # ping every interface IP of the device
-        for ip in interfaces:
-            if ping_ip(ip):
+async def _check_device(device, probe, sem, timeout):
+    interfaces = device.get("interfaces") or ([device["ip"]] if device.get("ip") else [])
+    latency = {}
+    device_status = "OFF"
+
+    tasks = [asyncio.ensure_future(_probe(ip, probe, sem, timeout)) for ip in interfaces]
+    try:
+        for fut in asyncio.as_completed(tasks):
+            ip, ms = await fut
+            latency[ip] = ms
+            if ms is not None:
                 device_status = "ON"
-                break   # no need to check other interfaces
+                break   # no need to wait for the other interfaces
+    finally:
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    return device.get("hostname"), device_status, latency
+
+
+async def sweep_async(devices, concurrency=STATUS_CONCURRENCY, method=None, timeout=STATUS_TIMEOUT):
+    probe = PROBES[resolve_probe(method)]
+    sem = asyncio.Semaphore(max(1, concurrency))
 
+    results = await asyncio.gather(
+        *(_check_device(d, probe, sem, timeout) for d in devices)
+    )
+
+    status_result, latency_result = {}, {}
+    for hostname, device_status, latency in results:
         status_result[hostname] = device_status
+        latency_result[hostname] = latency
+    return {"status": status_result, "latency": latency_result}
+
+
+def sweep_devices(devices, concurrency=STATUS_CONCURRENCY, method=None, timeout=STATUS_TIMEOUT):
+    """
+    Probe every interface of every device concurrently (capped by `concurrency`).
+    Returns {"status": {hostname: "ON"|"OFF"}, "latency": {hostname: {ip: ms|None}}}.
+    Only probes that finished are listed; None means the probe failed.
+    """
+    with timed("status_sweep"):
+        return asyncio.run(sweep_async(devices, concurrency, method, timeout))
+
 
-    return status_result
+def get_device_status(detail=False):
+    """Sweep every device in the inventory store."""
+    result = sweep_devices(load_inventory())
+    return result if detail else result["status"]
 
 
 if __name__ == "__main__":
-    print(get_device_status("network_inventory.json"))
+    print(get_device_status())
@@ -0,0 +1,132 @@
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from status_checker import sweep_devices
+
+STATUS_POLL_INTERVAL = float(os.getenv("STATUS_POLL_INTERVAL", "60"))
+STATUS_HISTORY = int(os.getenv("STATUS_HISTORY", "1000"))
+
+
+class StatusPoller:
+    """
+    Refreshes device reachability in the background and serves the last
+    sweep from memory, so dashboard reads never trigger a sweep of their own.
+    """
+
+    def __init__(self, load_devices, interval=STATUS_POLL_INTERVAL, history=STATUS_HISTORY):
+        self.load_devices = load_devices
+        self.interval = interval
+
+        self._snapshot = None       # {"status", "latency", "checkedAt"}
+        self._checked = 0.0         # monotonic time of the snapshot
+        self._transitions = deque(maxlen=history)
+        self._listeners = []
+        self._sweep_listeners = []
+        self._refresh_lock = threading.Lock()
+        self._start_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    # ----------------------------
+    # Lifecycle
+    # ----------------------------
+    def start(self):
+        with self._start_lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="status-poller", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def subscribe(self, fn):
+        """Call fn(transitions) after every sweep that flipped at least one device."""
+        self._listeners.append(fn)
+
+    def subscribe_sweeps(self, fn):
+        """Call fn(started, ended, error) after every on-demand sweep (epoch times; error or None)."""
+        self._sweep_listeners.append(fn)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.refresh(on_demand=False)
+            except Exception as e:
+                print(f"[ERROR] Status poll failed: {e}")
+            self._stop.wait(self.interval)
+
+    # ----------------------------
+    # Sweeps
+    # ----------------------------
+    def refresh(self, max_age=None, on_demand=True):
+        """
+        Run a sweep and swap in the new snapshot. With max_age, a sweep that
+        finished while we waited for the lock is reused instead.
+        """
+        with self._refresh_lock:
+            if max_age is not None and self._fresh(max_age):
+                return self._snapshot
+
+            started = time.time()
+            try:
+                result = sweep_devices(self.load_devices())
+            except Exception as e:
+                self._notify_sweep(on_demand, started, e)
+                raise
+            self._notify_sweep(on_demand, started, None)
+            checked_at = datetime.utcnow().isoformat() + "Z"
+
+            previous = self._snapshot["status"] if self._snapshot else {}
+            flipped = []
+            for hostname, status in result["status"].items():
+                old = previous.get(hostname)
+                if old is not None and old != status:
+                    flipped.append({
+                        "hostname": hostname,
+                        "from": old,
+                        "to": status,
+                        "at": checked_at,
+                    })
+            self._transitions.extend(flipped)
+
+            self._snapshot = {**result, "checkedAt": checked_at}
+            self._checked = time.monotonic()
+
+            for fn in self._listeners if flipped else ():
+                try:
+                    fn(flipped)
+                except Exception as e:
+                    print(f"[ERROR] Status listener failed: {e}")
+            return self._snapshot
+
+    def _notify_sweep(self, on_demand, started, error):
+        for fn in self._sweep_listeners if on_demand else ():
+            try:
+                fn(started, time.time(), error)
+            except Exception as e:
+                print(f"[ERROR] Sweep listener failed: {e}")
+
+    def _fresh(self, max_age):
+        return self._snapshot is not None and time.monotonic() - self._checked <= max_age
+
+    def snapshot(self, max_age=None):
+        """
+        Return the cached snapshot. If there is none yet, or it is older
+        than max_age seconds, sweep synchronously first.
+        """
+        if self._snapshot is None:
+            return self.refresh(max_age=float("inf"))
+        if max_age is not None and not self._fresh(max_age):
+            return self.refresh(max_age=max_age)
+        return self._snapshot
+
+    def transitions(self, hostname=None, limit=100):
+        """Most recent state changes first."""
+        items = [t for t in reversed(self._transitions)
+                 if hostname is None or t["hostname"] == hostname]
+        return items[:limit]
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+from servicenow_api import UPDATED_RAW_FIELD, parse_raw_datetime
+from tickets import load_tickets, save_tickets, upsert_tickets
+
+TICKET_CACHE_TTL = float(os.getenv("TICKET_CACHE_TTL", "60"))
+TICKET_FULL_SYNC_INTERVAL = float(os.getenv("TICKET_FULL_SYNC_INTERVAL", "3600"))
+
+
+class TicketSync:
+    """
+    Keeps data/incident_data.json in step with ServiceNow.
+
+    Reads are served from the local store while it is younger than `ttl`.
+    After that, only incidents updated since the newest raw (UTC)
+    sys_updated_on in the store are fetched and merged; every `full_interval` seconds a full sync
+    replaces the store so incidents deleted upstream disappear too. If
+    ServiceNow is unreachable, the last synced tickets are served.
+    """
+
+    def __init__(self, get_client, ttl=TICKET_CACHE_TTL, full_interval=TICKET_FULL_SYNC_INTERVAL):
+        self.get_client = get_client
+        self.ttl = ttl
+        self.full_interval = full_interval
+
+        self._tickets = None
+        self._synced = None         # monotonic time of the last successful sync
+        self._full_synced = None
+        self._count = None          # (monotonic time, server-side count)
+        self._lock = threading.Lock()
+        self._listeners = []
+
+    def subscribe(self, fn):
+        """Call fn({"added", "updated", "removed", "full"}) after a sync that changed the store."""
+        self._listeners.append(fn)
+
+    def _fresh(self, stamp):
+        return stamp is not None and time.monotonic() - stamp <= self.ttl
+
+    def _watermark(self):
+        """Newest raw update time as a datetime (None forces a full sync)."""
+        stamps = [parse_raw_datetime(t.get(UPDATED_RAW_FIELD)) for t in self._tickets]
+        stamps = [s for s in stamps if s]
+        return max(stamps) if stamps else None
+
+    # ----------------------------
+    # Sync
+    # ----------------------------
+    def sync(self, full=False):
+        with self._lock:
+            if self._tickets is None:
+                self._tickets = load_tickets()
+
+            now = time.monotonic()
+            watermark = self._watermark()
+            full = full or watermark is None or self._full_synced is None \
+                or now - self._full_synced > self.full_interval
+
+            client = self.get_client()
+            if full:
+                records = client.fetch_incidents()
+                changes = _diff(self._tickets, records)
+                if records != self._tickets:
+                    save_tickets(records)
+                self._tickets = records
+                self._full_synced = now
+            else:
+                merged = upsert_tickets(client.fetch_incidents(updated_since=watermark), list(self._tickets))
+                changes = {"added": merged["added"], "updated": merged["updated"], "removed": 0, "full": False}
+                self._tickets = merged["tickets"]
+            self._synced = now
+
+        if changes["added"] or changes["updated"] or changes["removed"]:
+            for fn in self._listeners:
+                try:
+                    fn(changes)
+                except Exception as e:
+                    print(f"[ERROR] Ticket listener failed: {e}")
+        return self._tickets
+
+    # ----------------------------
+    # Reads
+    # ----------------------------
+    def tickets(self, max_age=None):
+        ttl = self.ttl if max_age is None else max_age
+        if self._synced is not None and time.monotonic() - self._synced <= ttl:
+            return self._tickets
+        try:
+            return self.sync()
+        except Exception as e:
+            if not self._tickets:
+                raise
+            print(f"[WARN] ServiceNow sync failed, serving cached tickets: {e}")
+            return self._tickets
+
+    def count(self):
+        """Count from the ServiceNow Aggregate API, falling back to the local store."""
+        if self._count is not None and self._fresh(self._count[0]):
+            return self._count[1]
+        try:
+            count = self.get_client().count_incidents()
+        except Exception as e:
+            print(f"[WARN] ServiceNow count failed, counting local tickets: {e}")
+            return len(self.tickets())
+        self._count = (time.monotonic(), count)
+        return count
+
+
+def _diff(old, new):
+    key = lambda t: t.get("sys_id") or t.get("number")
+    before = {key(t): t for t in old}
+    after = {key(t): t for t in new}
+    return {
+        "added": sum(1 for k in after if k not in before),
+        "updated": sum(1 for k, t in after.items() if k in before and before[k] != t),
+        "removed": sum(1 for k in before if k not in after),
+        "full": True,
+    }
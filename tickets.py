@@ -1,12 +1,15 @@
 import json
+import os
 from pathlib import Path
 
+from instrumentation import timed
+
 TICKET_FILE = Path(__file__).resolve().parent / "data" / "incident_data.json"
 
 # Load tickets safely
 def load_tickets():
     try:
-        with open(TICKET_FILE, "r") as f:
+        with timed("json_load", TICKET_FILE.name), open(TICKET_FILE, "r") as f:
             data = f.read().strip()
             if not data:
                 return []
@@ -18,10 +21,33 @@ def load_tickets():
         save_tickets([])
         return []
 
-# Save tickets
+# Save tickets (write-then-rename, so readers never see a half-written file)
 def save_tickets(tickets):
-    with open(TICKET_FILE, "w") as f:
+    tmp = TICKET_FILE.with_name(f"{TICKET_FILE.name}.{os.getpid()}.tmp")
+    with open(tmp, "w") as f:
         json.dump(tickets, f, indent=4)
+    os.replace(tmp, TICKET_FILE)
+
+# Merge synced records into the store, matched by sys_id (or number)
+def upsert_tickets(records, tickets=None):
+    tickets = load_tickets() if tickets is None else tickets
+    key = lambda t: t.get("sys_id") or t.get("number")
+    position = {key(t): i for i, t in enumerate(tickets)}
+    added = updated = 0
+
+    for record in records:
+        i = position.get(key(record))
+        if i is None:
+            position[key(record)] = len(tickets)
+            tickets.append(record)
+            added += 1
+        elif tickets[i] != record:
+            tickets[i] = record
+            updated += 1
+
+    if added or updated:
+        save_tickets(tickets)
+    return {"tickets": tickets, "added": added, "updated": updated}
 
 # Add new ticket (if needed)
 def add_ticket(ticket):
@@ -0,0 +1,183 @@
+# real-appli-back/utils/alert_store.py
+from typing import Dict, Iterable, List, Optional, Tuple
+from bisect import bisect_left, insort
+from collections import Counter
+import base64
+import threading
+
+INDEXED_FIELDS = ("deviceId", "severity", "status")
+
+def encode_cursor(key: Tuple[str, int]) -> str:
+    return base64.urlsafe_b64encode(f"{key[0]}|{key[1]}".encode()).decode()
+
+def decode_cursor(cursor: str) -> Tuple[str, int]:
+    try:
+        opened_at, seq = base64.urlsafe_b64decode(cursor.encode()).decode().rsplit("|", 1)
+        return opened_at, int(seq)
+    except (ValueError, UnicodeDecodeError):
+        raise ValueError("Invalid cursor")
+
+class AlertStore:
+    """
+    In-memory alert index.
+    Keeps hash indexes on deviceId/severity/status, a timeline sorted by
+    openedAt, and running counters, so summaries are O(1), the newest K
+    alerts are O(K), and filtered pages never sort the full history.
+    """
+
+    def __init__(self, alerts: Iterable[Dict] = ()):
+        self._lock = threading.RLock()
+        self._by_id: Dict[str, Dict] = {}
+        self._keys: Dict[str, Tuple[str, int]] = {}           # id -> timeline key
+        self._ids_by_key: Dict[Tuple[str, int], str] = {}
+        self._timeline: List[Tuple[str, int]] = []           # ascending (openedAt, -seq)
+        self._index: Dict[str, Dict[str, set]] = {f: {} for f in INDEXED_FIELDS}
+        self._seq = 0
+        self.open_count = 0
+        self.by_severity: Counter = Counter()
+        self.version = 0
+        for a in alerts:
+            self._add_locked(a)
+
+    # ---- maintenance ----
+    def _add_locked(self, alert: Dict, seq: Optional[int] = None) -> None:
+        aid = alert["id"]
+        if seq is None:
+            self._seq += 1
+            seq = self._seq
+        # -seq: equal timestamps come out in insertion order when walked newest-first
+        key = (alert.get("openedAt") or "", -seq)
+        self._by_id[aid] = alert
+        self._keys[aid] = key
+        self._ids_by_key[key] = aid
+        insort(self._timeline, key)
+        for f in INDEXED_FIELDS:
+            self._index[f].setdefault(alert.get(f), set()).add(aid)
+        if alert.get("status") == "open":
+            self.open_count += 1
+        self.by_severity[alert.get("severity")] += 1
+
+    def _remove_locked(self, aid: str) -> Dict:
+        alert = self._by_id.pop(aid)
+        key = self._keys.pop(aid)
+        del self._ids_by_key[key]
+        del self._timeline[bisect_left(self._timeline, key)]
+        for f in INDEXED_FIELDS:
+            ids = self._index[f][alert.get(f)]
+            ids.discard(aid)
+            if not ids:
+                del self._index[f][alert.get(f)]
+        if alert.get("status") == "open":
+            self.open_count -= 1
+        self.by_severity[alert.get("severity")] -= 1
+        if not self.by_severity[alert.get("severity")]:
+            del self.by_severity[alert.get("severity")]
+        return alert
+
+    def upsert(self, alert: Dict) -> Optional[Dict]:
+        """Insert or replace by id; returns the previous version (or None)."""
+        with self._lock:
+            old = self._by_id.get(alert["id"])
+            if old is not None:
+                if old == alert:
+                    return old
+                seq = -self._keys[alert["id"]][1]
+                self._remove_locked(alert["id"])
+                self._add_locked(alert, seq)
+            else:
+                self._add_locked(alert)
+            self.version += 1
+            return old
+
+    def remove(self, aid: str) -> Optional[Dict]:
+        with self._lock:
+            if aid not in self._by_id:
+                return None
+            self.version += 1
+            return self._remove_locked(aid)
+
+    def replace_all(self, alerts: Iterable[Dict]) -> Dict[str, List]:
+        """
+        Sync with a full alert list, touching only what changed.
+        Returns the delta: {"added": [...], "updated": [(old, new)], "removed": [...]}.
+        """
+        delta = {"added": [], "updated": [], "removed": []}
+        with self._lock:
+            incoming = {a["id"]: a for a in alerts}
+            for aid in [aid for aid in self._by_id if aid not in incoming]:
+                delta["removed"].append(self._remove_locked(aid))
+            for aid, alert in incoming.items():
+                old = self._by_id.get(aid)
+                if old is None:
+                    self._add_locked(alert)
+                    delta["added"].append(alert)
+                elif old != alert:
+                    seq = -self._keys[aid][1]
+                    self._remove_locked(aid)
+                    self._add_locked(alert, seq)
+                    delta["updated"].append((old, alert))
+            if any(delta.values()):
+                self.version += 1
+        return delta
+
+    # ---- reads ----
+    def get(self, aid: str) -> Optional[Dict]:
+        return self._by_id.get(aid)
+
+    def summary(self) -> Dict:
+        with self._lock:
+            total = len(self._by_id)
+            return {
+                "total": total,
+                "open": self.open_count,
+                "closed": total - self.open_count,
+                "bySeverity": dict(self.by_severity),
+            }
+
+    def recent(self, limit: int = 20) -> List[Dict]:
+        if limit <= 0:
+            return []
+        with self._lock:
+            return [self._by_id[self._ids_by_key[k]] for k in reversed(self._timeline[-limit:])]
+
+    def query(self, filters: Optional[Dict[str, List[str]]] = None, limit: int = 20,
+              cursor: Optional[str] = None, since: Optional[str] = None,
+              until: Optional[str] = None) -> Tuple[List[Dict], Optional[str]]:
+        """
+        Newest-first page of alerts matching all `filters` (field -> allowed values)
+        and since <= openedAt <= until. Returns (items, nextCursor).
+        """
+        start = decode_cursor(cursor) if cursor else None
+        with self._lock:
+            candidates = None
+            for field, values in (filters or {}).items():
+                if field not in INDEXED_FIELDS or not values:
+                    continue
+                ids = set().union(*(self._index[field].get(v, set()) for v in values))
+                candidates = ids if candidates is None else candidates & ids
+
+            if candidates is not None and len(candidates) < len(self._timeline) // 8:
+                # selective filter: order only the matching alerts
+                keys = sorted((self._keys[aid] for aid in candidates), reverse=True)
+            else:
+                # walk the timeline newest-first and skip non-matching alerts
+                hi = bisect_left(self._timeline, start) if start else len(self._timeline)
+                keys = (self._timeline[i] for i in range(hi - 1, -1, -1))
+                start = None
+
+            items, last = [], None
+            for key in keys:
+                if start and key >= start:
+                    continue
+                if until and key[0] > until:
+                    continue
+                if since and key[0] < since:
+                    break
+                aid = self._ids_by_key[key]
+                if candidates is not None and aid not in candidates:
+                    continue
+                if len(items) == limit:
+                    return items, encode_cursor(last)
+                items.append(self._by_id[aid])
+                last = key
+            return items, None
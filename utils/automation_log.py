@@ -0,0 +1,233 @@
+# real-appli-back/utils/automation_log.py
+from typing import Dict, List, Optional
+from bisect import insort, bisect_left
+from datetime import datetime, timezone
+import json
+import threading
+import time
+import uuid
+
+from utils.sqlite_store import SQLiteStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id         INTEGER PRIMARY KEY AUTOINCREMENT,
+    task_id    TEXT UNIQUE NOT NULL,
+    task_type  TEXT NOT NULL,
+    status     TEXT NOT NULL,
+    started_at TEXT NOT NULL,
+    started_ts REAL NOT NULL,
+    duration   REAL,
+    data       TEXT NOT NULL,
+    imported   INTEGER NOT NULL DEFAULT 0   -- 1: mirrored from automation.json
+);
+CREATE INDEX IF NOT EXISTS idx_runs_started ON runs(started_at);
+CREATE INDEX IF NOT EXISTS idx_runs_type_started ON runs(task_type, started_at);
+
+CREATE TABLE IF NOT EXISTS type_counts (
+    task_type TEXT PRIMARY KEY,
+    total     INTEGER NOT NULL,
+    success   INTEGER NOT NULL
+);
+"""
+
+WINDOWS = {"1h": 3600, "24h": 86400, "7d": 7 * 86400}
+
+def _epoch(iso: Optional[str]) -> Optional[float]:
+    if not iso:
+        return None
+    dt = datetime.fromisoformat(iso.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+def _iso(ts: float) -> str:
+    return datetime.fromtimestamp(ts, tz=timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+class _Window:
+    """Runs started in the last `span` seconds: success count and sorted durations."""
+
+    def __init__(self, span: int):
+        self.span = span
+        self.runs: List[tuple] = []      # (started_ts, seq, ok, duration), sorted by start
+        self.durations: List[float] = []
+        self.success = 0
+        self._seq = 0
+
+    def add(self, ts: float, ok: bool, duration: Optional[float]) -> None:
+        # runs are recorded when they end, so a long run can arrive after later-started ones
+        self._seq += 1
+        insort(self.runs, (ts, self._seq, ok, duration))
+        self.success += ok
+        if duration is not None:
+            insort(self.durations, duration)
+
+    def expire(self, now: float) -> None:
+        cut = bisect_left(self.runs, (now - self.span,))
+        for _, _, ok, duration in self.runs[:cut]:
+            self.success -= ok
+            if duration is not None:
+                del self.durations[bisect_left(self.durations, duration)]
+        del self.runs[:cut]
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.durations:
+            return None
+        rank = max(0, -(-len(self.durations) * p // 100) - 1)   # nearest rank
+        return round(self.durations[int(rank)], 3)
+
+    def to_dict(self) -> Dict:
+        total = len(self.runs)
+        return {
+            "total": total,
+            "success": self.success,
+            "failed": total - self.success,
+            "successRate": round(self.success / total * 100, 1) if total else None,
+            "p50Duration": self.percentile(50),
+            "p95Duration": self.percentile(95),
+        }
+
+class AutomationLog(SQLiteStore):
+    """
+    Persisted automation run log (SQLite, indexed by startedAt and taskType).
+    Per-type totals live in their own table, kept in step with every write,
+    and rolling 1h/24h/7d windows are kept in memory, so the summary never
+    scans or sorts the history. Rows mirrored from automation.json are
+    upserted and pruned to match the file; live runs are only appended.
+    """
+
+    def __init__(self, db_path: str):
+        super().__init__(db_path)
+        self._lock = threading.Lock()
+        self._conn().executescript(SCHEMA)
+        self._windows = {name: _Window(span) for name, span in WINDOWS.items()}
+        self._load_windows()
+
+    def _load_windows(self) -> None:
+        """(Re)build the in-memory windows from the last 7 days of the log."""
+        windows = {name: _Window(span) for name, span in WINDOWS.items()}
+        with self._lock:   # no live run can commit between the read and the swap
+            rows = self._conn().execute(
+                "SELECT started_ts, status, duration FROM runs WHERE started_ts >= ?",
+                (time.time() - max(WINDOWS.values()),)
+            )
+            for ts, status, duration in rows:
+                for w in windows.values():
+                    w.add(ts, status == "success", duration)
+            self._windows = windows
+
+    # ---- writes ----
+    @staticmethod
+    def _row(task: Dict, imported: bool) -> tuple:
+        started = _epoch(task["startedAt"])
+        ended = _epoch(task.get("endedAt"))
+        duration = ended - started if ended is not None else None
+        return (task["taskId"], task["taskType"], task["status"], task["startedAt"], started, duration,
+                json.dumps(task), int(imported))
+
+    def import_tasks(self, tasks: List[Dict]) -> int:
+        """
+        Mirror automation.json: its tasks are upserted by taskId and imported
+        rows no longer in the file are deleted. Returns the number of rows changed.
+        """
+        with self._write() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO runs (task_id, task_type, status, started_at, started_ts, duration, data, imported) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT(task_id) DO UPDATE SET task_type = excluded.task_type, status = excluded.status, "
+                "started_at = excluded.started_at, started_ts = excluded.started_ts, "
+                "duration = excluded.duration, data = excluded.data, imported = 1 "
+                "WHERE runs.data != excluded.data OR runs.imported = 0",
+                [self._row(t, imported=True) for t in tasks]
+            )
+            conn.execute(
+                "DELETE FROM runs WHERE imported = 1 AND task_id NOT IN (SELECT value FROM json_each(?))",
+                (json.dumps([t["taskId"] for t in tasks]),)
+            )
+            changed = conn.total_changes - before
+            if changed:
+                # file reloads are rare: recount per type (in first-seen order) rather than diff
+                conn.execute("DELETE FROM type_counts")
+                conn.execute(
+                    "INSERT INTO type_counts (task_type, total, success) "
+                    "SELECT task_type, COUNT(*), SUM(status = 'success') FROM runs "
+                    "GROUP BY task_type ORDER BY MIN(id)"
+                )
+        if changed:
+            self._load_windows()
+        return changed
+
+    def record(self, task_type: str, status: str, started: float, ended: float,
+               devices: Optional[List[str]] = None, summary: str = "", **extra) -> Dict:
+        """Append a live run (epoch start/end) and return its record."""
+        task = {
+            "taskId": f"R-{uuid.uuid4().hex[:10]}",
+            "taskType": task_type,
+            "devicesInvolved": devices or [],
+            "startedAt": _iso(started),
+            "endedAt": _iso(ended),
+            "status": status,
+            "summary": summary,
+            **extra,
+        }
+        row = self._row(task, imported=False)
+        ok = status == "success"
+        with self._lock:
+            with self._write() as conn:
+                conn.execute(
+                    "INSERT INTO runs (task_id, task_type, status, started_at, started_ts, duration, data, imported) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)", row
+                )
+                conn.execute(
+                    "INSERT INTO type_counts (task_type, total, success) VALUES (?, 1, ?) "
+                    "ON CONFLICT(task_type) DO UPDATE SET total = total + 1, success = success + excluded.success",
+                    (task_type, int(ok))
+                )
+            # only after the commit, so a failed write never shows up in the windows
+            for w in self._windows.values():
+                w.add(row[4], ok, row[5])
+        return task
+
+    # ---- reads ----
+    def recent(self, limit: int = 10, task_type: Optional[str] = None,
+               before: Optional[str] = None) -> List[Dict]:
+        """Newest first, read straight off the startedAt (or taskType, startedAt) index."""
+        sql, args = "SELECT data FROM runs", []
+        where = []
+        if task_type:
+            where.append("task_type = ?")
+            args.append(task_type)
+        if before:
+            where.append("started_at < ?")
+            args.append(before)
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY started_at DESC, id ASC LIMIT ?"
+        args.append(limit)
+        return [json.loads(data) for (data,) in self._conn().execute(sql, args)]
+
+    def live_runs(self) -> List[Dict]:
+        """Runs recorded by this backend (not mirrored from automation.json), oldest first."""
+        rows = self._conn().execute("SELECT data FROM runs WHERE imported = 0 ORDER BY id")
+        return [json.loads(data) for (data,) in rows]
+
+    def windows(self) -> Dict[str, Dict]:
+        now = time.time()
+        with self._lock:
+            for w in self._windows.values():
+                w.expire(now)
+            return {name: w.to_dict() for name, w in self._windows.items()}
+
+    def summary(self, recent: int = 10) -> Dict:
+        rows = self._conn().execute("SELECT task_type, total, success FROM type_counts ORDER BY rowid").fetchall()
+        total = sum(r[1] for r in rows)
+        success = sum(r[2] for r in rows)
+        return {
+            "total": total,
+            "success": success,
+            "failed": total - success,
+            "byType": {t: n for t, n, _ in rows},
+            "recent": self.recent(recent),
+            "windows": self.windows(),
+        }
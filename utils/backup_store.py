@@ -0,0 +1,156 @@
+# real-appli-back/utils/backup_store.py
+from typing import Dict, Iterator, List, Optional
+from datetime import datetime
+from pathlib import Path
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+
+from utils.sqlite_store import SQLiteStore
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS backups (
+    id             INTEGER PRIMARY KEY AUTOINCREMENT,
+    device_id      TEXT NOT NULL,
+    timestamp      TEXT NOT NULL,
+    config_version TEXT,
+    sha256         TEXT,
+    size           INTEGER,
+    changes        TEXT NOT NULL DEFAULT '[]'
+);
+CREATE INDEX IF NOT EXISTS idx_backups_device_ts ON backups(device_id, timestamp);
+-- a plain UNIQUE constraint would let rows without a configVersion repeat (NULLs are distinct)
+CREATE UNIQUE INDEX IF NOT EXISTS idx_backups_unique ON backups(device_id, timestamp, IFNULL(config_version, ''));
+"""
+
+class BackupStore(SQLiteStore):
+    """
+    Config backup history: an SQLite index by device and timestamp plus
+    content-addressed, gzip-compressed config blobs (one file per distinct
+    config, named by its sha256), so identical backups share storage.
+    Records without a config (e.g. imported from backups.json) keep only
+    their metadata.
+    """
+
+    row_factory = sqlite3.Row
+
+    def __init__(self, db_path: str, blob_dir: str):
+        super().__init__(db_path)
+        self.blob_dir = Path(blob_dir)
+        self._conn().executescript(SCHEMA)
+
+    # ---- blobs ----
+    def _blob_path(self, sha: str) -> Path:
+        return self.blob_dir / sha[:2] / f"{sha}.gz"
+
+    def _put_blob(self, sha: str, data: bytes) -> bool:
+        """Store config bytes under their content hash; returns True if already stored."""
+        path = self._blob_path(sha)
+        if path.exists():
+            return True
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+        with gzip.open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+        return False
+
+    def has_config(self, sha: str) -> bool:
+        return self._blob_path(sha).exists()
+
+    def iter_config(self, sha: str) -> Optional[Iterator[str]]:
+        """Stream a stored config line by line (decompressed on the fly); None if its blob is missing."""
+        try:
+            f = gzip.open(self._blob_path(sha), "rt")
+        except FileNotFoundError:
+            return None
+        return self._lines(f)
+
+    @staticmethod
+    def _lines(f) -> Iterator[str]:
+        with f:
+            yield from f
+
+    # ---- records ----
+    @staticmethod
+    def _record(row: sqlite3.Row) -> Dict:
+        return {
+            "id": row["id"],
+            "deviceId": row["device_id"],
+            "timestamp": row["timestamp"],
+            "configVersion": row["config_version"],
+            "changes": json.loads(row["changes"]),
+            "configHash": row["sha256"],
+            "size": row["size"],
+        }
+
+    def add(self, device_id: str, config: Optional[str] = None, timestamp: Optional[str] = None,
+            config_version: Optional[str] = None, changes: Optional[List[str]] = None) -> Dict:
+        """
+        Record a backup. Returns the record plus "deduplicated" (config blob
+        already stored). The blob is written only once the row is in, inside
+        the same transaction, so a rejected duplicate leaves nothing on disk.
+        """
+        timestamp = timestamp or datetime.utcnow().replace(microsecond=0).isoformat() + "Z"
+        data = config.encode() if config is not None else None
+        sha = hashlib.sha256(data).hexdigest() if data is not None else None
+        dedup = written = False
+        try:
+            with self._write() as conn:
+                cur = conn.execute(
+                    "INSERT INTO backups (device_id, timestamp, config_version, sha256, size, changes) "
+                    "VALUES (?, ?, ?, ?, ?, ?)",
+                    (device_id, timestamp, config_version, sha,
+                     len(data) if data is not None else None, json.dumps(changes or []))
+                )
+                if data is not None:
+                    dedup = self._put_blob(sha, data)
+                    written = not dedup
+                row = conn.execute("SELECT * FROM backups WHERE id = ?", (cur.lastrowid,)).fetchone()
+        except sqlite3.Error:
+            # commit failed after a new blob was written: drop it unless something references it
+            if written and not self._conn().execute(
+                    "SELECT 1 FROM backups WHERE sha256 = ? LIMIT 1", (sha,)).fetchone():
+                self._blob_path(sha).unlink(missing_ok=True)
+            raise
+        return {**self._record(row), "deduplicated": dedup}
+
+    def import_entries(self, entries: List[Dict]) -> int:
+        """Import backups.json style metadata; entries already present are skipped."""
+        with self._write() as conn:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO backups (device_id, timestamp, config_version, changes) "
+                "VALUES (?, ?, ?, ?)",
+                [(e["deviceId"], e["timestamp"], e.get("configVersion"), json.dumps(e.get("changes", [])))
+                 for e in entries]
+            )
+            return conn.total_changes - before
+
+    def history(self, device_id: str, limit: int = 50, before: Optional[str] = None) -> List[Dict]:
+        """Newest first; `before` pages by timestamp."""
+        sql = "SELECT * FROM backups WHERE device_id = ?"
+        args: list = [device_id]
+        if before:
+            sql += " AND timestamp < ?"
+            args.append(before)
+        sql += " ORDER BY timestamp DESC, id DESC LIMIT ?"
+        args.append(limit)
+        return [self._record(r) for r in self._conn().execute(sql, args)]
+
+    def get(self, device_id: str, ref: str) -> Optional[Dict]:
+        """A device's backup by id, configVersion or timestamp."""
+        row = self._conn().execute(
+            "SELECT * FROM backups WHERE device_id = ? AND "
+            "(CAST(id AS TEXT) = ? OR config_version = ? OR timestamp = ?) "
+            "ORDER BY timestamp DESC, id DESC LIMIT 1",
+            (device_id, ref, ref, ref)
+        ).fetchone()
+        return self._record(row) if row else None
+
+    def latest(self, device_id: str, count: int = 2) -> List[Dict]:
+        """The last `count` backups, oldest first."""
+        return list(reversed(self.history(device_id, limit=count)))
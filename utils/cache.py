@@ -0,0 +1,58 @@
+# real-appli-back/utils/cache.py
+from typing import Any, Callable, Dict, Iterable, Tuple
+import threading
+
+class AggregateCache:
+    """
+    Memoize dashboard aggregates per data generation.
+    Every dataset (devices, alerts, ...) has a generation counter; an aggregate
+    is recomputed only after one of the datasets it depends on was invalidated.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._generations: Dict[str, int] = {}
+        self._entries: Dict[str, Tuple[Tuple[str, ...], Tuple[int, ...], Any]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, *datasets: str) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(d, 0) for d in datasets)
+
+    def invalidate(self, *datasets: str) -> None:
+        """Bump the given datasets (all known ones when called without args)."""
+        with self._lock:
+            names = datasets or tuple(self._generations)
+            for d in names:
+                self._generations[d] = self._generations.get(d, 0) + 1
+            # drop entries that can no longer be served
+            stale = [k for k, (deps, _, _) in self._entries.items() if set(deps) & set(names)]
+            for k in stale:
+                del self._entries[k]
+            if not datasets:
+                self._entries.clear()
+
+    def get(self, name: str, datasets: Iterable[str], compute: Callable[[], Any]) -> Any:
+        deps = tuple(datasets)
+        key = self.generation(*deps)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[1] == key:
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+        # compute outside the lock; if data changed meanwhile the entry is simply stale next time
+        value = compute()
+        with self._lock:
+            self._entries[name] = (deps, key, value)
+        return value
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "generations": dict(self._generations),
+            }
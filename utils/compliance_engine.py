@@ -0,0 +1,226 @@
+# real-appli-back/utils/compliance_engine.py
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+
+CHECK_TYPES = ("regex", "line", "section")
+PARALLEL_THRESHOLD = 64   # smaller batches are evaluated in-process
+CACHE_SIZE = int(os.getenv("COMPLIANCE_CACHE_SIZE", "20000"))
+RULE_SETS = int(os.getenv("COMPLIANCE_RULE_SETS", "4"))   # compiled rule-sets (and pools) kept
+
+# Never fork the threaded web server itself: workers come from a fork server
+# (or are spawned where that is unavailable)
+_MP_CONTEXT = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+# ---------------------------------
+# Rule compilation
+# ---------------------------------
+def compile_rule(rule: Dict) -> Tuple:
+    """
+    Turn a rule's "check" definition into a tuple of precompiled patterns.
+
+      {"type": "regex", "pattern": "...", "expect": "present"|"absent"}
+          pattern searched line by line over the whole config
+      {"type": "line", "line": "...", "expect": ...}
+          exact line (surrounding whitespace ignored)
+      {"type": "section", "parent": "...", "pattern": "...", "expect": ..., "ifMissing": "pass"|"fail"}
+          pattern checked inside every section whose header matches parent
+    """
+    check = rule.get("check")
+    if not check:
+        return (rule["id"], None)
+    kind = check.get("type")
+    if kind not in CHECK_TYPES:
+        raise ValueError(f"Rule {rule['id']}: check type must be one of {', '.join(CHECK_TYPES)}")
+    expect = check.get("expect", "present")
+    if expect not in ("present", "absent"):
+        raise ValueError(f"Rule {rule['id']}: expect must be 'present' or 'absent'")
+    present = expect == "present"
+
+    try:
+        if kind == "regex":
+            return (rule["id"], kind, re.compile(check["pattern"], re.MULTILINE), present)
+        if kind == "line":
+            return (rule["id"], kind, check["line"].strip(), present)
+        return (
+            rule["id"], kind, re.compile(check["parent"]), re.compile(check["pattern"]),
+            present, check.get("ifMissing", "pass") == "pass"
+        )
+    except KeyError as e:
+        raise ValueError(f"Rule {rule['id']}: {kind} check needs '{e.args[0]}'")
+    except re.error as e:
+        raise ValueError(f"Rule {rule['id']}: invalid pattern: {e}")
+
+def compile_rules(rules: List[Dict]) -> List[Tuple]:
+    return [compile_rule(r) for r in rules]
+
+def rules_fingerprint(rules: List[Dict]) -> str:
+    return hashlib.sha256(json.dumps(rules, sort_keys=True).encode()).hexdigest()
+
+def config_hash(config: str) -> str:
+    return hashlib.sha256(config.encode()).hexdigest()
+
+# ---------------------------------
+# Evaluation
+# ---------------------------------
+def parse_sections(config: str) -> List[Tuple[str, List[str]]]:
+    """IOS-style sections: every unindented line with the indented lines below it."""
+    sections = []
+    for line in config.splitlines():
+        if not line.strip() or line.startswith("!"):
+            continue
+        if line[0] in " \t" and sections:
+            sections[-1][1].append(line.strip())
+        else:
+            sections.append((line.rstrip(), []))
+    return sections
+
+def evaluate_config(compiled: List[Tuple], config: str) -> Tuple[List[str], List[str]]:
+    """Run compiled rules over one config; returns (passed, failed) rule ids. Rules without a check are skipped."""
+    lines = None
+    sections = None
+    passed, failed = [], []
+    for rule in compiled:
+        rid, kind = rule[0], rule[1]
+        if kind is None:
+            continue
+        if kind == "regex":
+            ok = (rule[2].search(config) is not None) == rule[3]
+        elif kind == "line":
+            if lines is None:
+                lines = {l.strip() for l in config.splitlines()}
+            ok = (rule[2] in lines) == rule[3]
+        else:
+            if sections is None:
+                sections = parse_sections(config)
+            parent, pattern, present, if_missing = rule[2], rule[3], rule[4], rule[5]
+            matched = [children for header, children in sections if parent.search(header)]
+            if not matched:
+                ok = if_missing
+            else:
+                ok = all(any(pattern.search(c) for c in children) == present for children in matched)
+        (passed if ok else failed).append(rid)
+    return passed, failed
+
+# Per-process state for pool workers: rules are compiled once per worker
+_worker_rules: Optional[List[Tuple]] = None
+
+def _init_worker(rules: List[Dict]) -> None:
+    global _worker_rules
+    _worker_rules = compile_rules(rules)
+
+def _evaluate_in_worker(config: str) -> Tuple[List[str], List[str]]:
+    return evaluate_config(_worker_rules, config)
+
+class _RuleSet:
+    """Compiled rules plus the worker pool initialised with them (created on first large batch)."""
+
+    def __init__(self, key: str, rules: List[Dict]):
+        self.key = key
+        self.rules = rules
+        self.compiled = compile_rules(rules)
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    def get_pool(self, workers: int) -> ProcessPoolExecutor:
+        if self.pool is None:
+            self.pool = ProcessPoolExecutor(
+                max_workers=workers, mp_context=_MP_CONTEXT,
+                initializer=_init_worker, initargs=(self.rules,)
+            )
+        return self.pool
+
+    def close(self) -> None:
+        # queued work of requests still using this rule-set is allowed to finish
+        if self.pool is not None:
+            self.pool.shutdown(wait=False)
+
+class ComplianceEngine:
+    """
+    Evaluates rule checks over raw running-configs.
+    Each call names its rules; rule-sets are compiled once (the last
+    `rule_sets` kept, each with its own process pool), large batches are
+    spread over that pool, and results are cached by (rule-set, config
+    sha256), so a re-check only evaluates configs that changed.
+    """
+
+    def __init__(self, workers: Optional[int] = None, cache_size: int = CACHE_SIZE,
+                 rule_sets: int = RULE_SETS):
+        self.workers = workers or os.cpu_count() or 1
+        self.cache_size = cache_size
+        self.rule_sets = max(1, rule_sets)
+        self._lock = threading.Lock()
+        self._rule_sets: "OrderedDict[str, _RuleSet]" = OrderedDict()
+        self._cache: "OrderedDict[Tuple[str, str], Tuple[List[str], List[str]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def _rule_set(self, rules: List[Dict]) -> _RuleSet:
+        """The compiled rule-set for `rules` (call with the lock held); raises ValueError on bad rules."""
+        key = rules_fingerprint(rules)
+        rule_set = self._rule_sets.get(key)
+        if rule_set is None:
+            rule_set = self._rule_sets[key] = _RuleSet(key, rules)
+            while len(self._rule_sets) > self.rule_sets:
+                self._rule_sets.popitem(last=False)[1].close()
+        self._rule_sets.move_to_end(key)
+        return rule_set
+
+    def evaluate(self, configs: Dict[str, str], rules: List[Dict]) -> Dict:
+        """
+        configs: {deviceId: running-config text}, checked against `rules`.
+        Returns {"results": [{"deviceId", "passed", "failed"}], "evaluated", "cached"},
+        results in input order and in the compliance.json format.
+        """
+        with self._lock:
+            rule_set = self._rule_set(rules)
+            rules_key = rule_set.key
+
+            hashes = {did: config_hash(text) for did, text in configs.items()}
+            outcome, todo = {}, {}
+            for did, h in hashes.items():
+                hit = self._cache.get((rules_key, h))
+                if hit is not None:
+                    self._cache.move_to_end((rules_key, h))
+                    outcome[h] = hit
+                elif h not in todo:
+                    todo[h] = configs[did]
+            self.hits += len(configs) - len(todo)
+            self.misses += len(todo)
+            if len(todo) >= PARALLEL_THRESHOLD and self.workers > 1:
+                # map() submits everything now, before an eviction could shut the pool down
+                chunk = max(1, len(todo) // (self.workers * 4))
+                evaluated = rule_set.get_pool(self.workers).map(
+                    _evaluate_in_worker, todo.values(), chunksize=chunk
+                )
+            else:
+                evaluated = None
+
+        if evaluated is None:
+            evaluated = (evaluate_config(rule_set.compiled, text) for text in todo.values())
+        fresh = dict(zip(todo, evaluated))
+
+        with self._lock:
+            for h, res in fresh.items():
+                self._cache[(rules_key, h)] = res
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        outcome.update(fresh)
+
+        results = []
+        for did, h in hashes.items():
+            passed, failed = outcome[h]
+            results.append({"deviceId": did, "passed": list(passed), "failed": list(failed)})
+        return {"results": results, "evaluated": len(fresh), "cached": len(configs) - len(todo)}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses,
+                    "workers": self.workers, "ruleSets": len(self._rule_sets)}
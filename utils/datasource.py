@@ -0,0 +1,106 @@
+# real-appli-back/utils/datasource.py
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+from pathlib import Path
+import json
+import os
+import threading
+
+from instrumentation import timed
+
+class DataSource:
+    """
+    Hot-reloadable view over the JSON files in data/.
+    Files are polled by mtime/size; only changed files are re-parsed, and the
+    new snapshot replaces the old one in a single reference swap, so readers
+    never block and always see a consistent set of datasets.
+    Listeners are called with the names of the datasets that changed.
+    """
+
+    def __init__(self, data_dir: Path, files: Dict[str, str], interval: float = 2.0):
+        self.data_dir = Path(data_dir)
+        self.files = dict(files)
+        self.interval = interval
+        self._snapshot: Dict[str, Any] = {}
+        self._stamps: Dict[str, Tuple[int, int]] = {}
+        self._listeners: List[Callable[[List[str]], None]] = []
+        self._lock = threading.Lock()     # serialises reloads, never taken by readers
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.check()
+
+    # ---- readers ----
+    def snapshot(self) -> Dict[str, Any]:
+        return self._snapshot
+
+    def get(self, name: str) -> Any:
+        return self._snapshot[name]
+
+    # ---- reloading ----
+    def subscribe(self, fn: Callable[[List[str]], None]) -> None:
+        self._listeners.append(fn)
+
+    def _stamp(self, name: str) -> Tuple[int, int]:
+        st = os.stat(self.data_dir / self.files[name])
+        return (st.st_mtime_ns, st.st_size)
+
+    def check(self, force: Iterable[str] = ()) -> List[str]:
+        """Re-parse files whose mtime/size changed (or that are forced); returns changed names."""
+        force = set(force)
+        with self._lock:
+            parsed = {}
+            stamps = {}
+            for name, fname in self.files.items():
+                try:
+                    stamp = self._stamp(name)
+                except OSError as e:
+                    if name not in self._snapshot:
+                        raise
+                    print(f"[WARN] {fname}: {e}; keeping previous data")
+                    continue
+                if name not in force and self._stamps.get(name) == stamp:
+                    continue
+                try:
+                    with timed("json_load", fname), open(self.data_dir / fname, "r") as f:
+                        parsed[name] = json.load(f)
+                except ValueError as e:
+                    # half-written or broken file: keep serving the last good copy
+                    if name not in self._snapshot:
+                        raise
+                    print(f"[WARN] {fname}: {e}; keeping previous data")
+                    self._stamps[name] = stamp  # warn once, retry when it changes again
+                    continue
+                stamps[name] = stamp
+
+            if not parsed:
+                return []
+            self._snapshot = {**self._snapshot, **parsed}
+            self._stamps.update(stamps)
+
+        changed = list(parsed)
+        for fn in self._listeners:
+            try:
+                fn(changed)
+            except Exception as e:
+                print(f"[ERROR] data reload listener failed: {e}")
+        return changed
+
+    # ---- background watcher ----
+    def start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._watch, name="data-watcher", daemon=True)
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                print(f"[ERROR] data reload failed: {e}")
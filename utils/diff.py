@@ -1,5 +1,8 @@
 # real-appli-back/utils/diff.py
-from typing import List, Dict
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+from difflib import SequenceMatcher
+import hashlib
+import re
 
 def get_before_after_for_device(device_id: str, backups: List[Dict]):
     """
@@ -14,11 +17,120 @@ def get_before_after_for_device(device_id: str, backups: List[Dict]):
 def compute_diff_summary(before: Dict, after: Dict):
     """
     Very simple "semantic" diff summary: show added/removed/modified strings
-    (We treat 'changes' arrays as bullet list.)
+    (We treat 'changes' arrays as bullet list; order follows the backups.)
     """
-    before_set = set(before.get("changes", []))
-    after_set = set(after.get("changes", []))
-    added = list(after_set - before_set)
-    removed = list(before_set - after_set)
-    common = list(before_set & after_set)
+    before_list = before.get("changes", [])
+    after_list = after.get("changes", [])
+    before_set = set(before_list)
+    after_set = set(after_list)
+    added = [c for c in dict.fromkeys(after_list) if c not in before_set]
+    removed = [c for c in dict.fromkeys(before_list) if c not in after_set]
+    common = [c for c in dict.fromkeys(after_list) if c in before_set]
     return {"added": added, "removed": removed, "common": common}
+
+# ---------------------------------
+# Running-config diff (IOS hierarchy aware)
+# ---------------------------------
+# Lines that change on every "show running-config" without a real config change
+_VOLATILE = re.compile(r"^(Building configuration|Current configuration\s*:|ntp clock-period)")
+
+def iter_sections(lines: Iterable[str]) -> Iterator[Tuple[str, str, List[str]]]:
+    """
+    Stream (key, header, body) per top-level section: an unindented line and the
+    indented lines under it (nested blocks keep their indentation). Keys get
+    a "#n" suffix when a header repeats, so every section is addressable.
+    Only one section is held in memory at a time.
+    """
+    seen: Dict[str, int] = {}
+    header, body = None, []
+    for raw in lines:
+        line = raw.rstrip("\r\n").rstrip()
+        if not line.strip() or line.lstrip().startswith("!") or _VOLATILE.match(line):
+            continue
+        if line[0] in " \t":
+            if header is None:
+                header = ""
+            body.append(line)
+            continue
+        if header is not None:
+            yield _key(header, seen), header, body
+        header, body = line, []
+    if header is not None:
+        yield _key(header, seen), header, body
+
+def _key(header: str, seen: Dict[str, int]) -> str:
+    n = seen.get(header, 0)
+    seen[header] = n + 1
+    return header if n == 0 else f"{header}#{n}"
+
+def _section_digests(lines: Iterable[str]) -> Tuple[List[str], Dict[str, str]]:
+    order, digests = [], {}
+    for key, _, body in iter_sections(lines):
+        order.append(key)
+        digests[key] = hashlib.sha1("\n".join(body).encode()).hexdigest()
+    return order, digests
+
+def _collect(lines: Iterable[str], keys: set) -> Dict[str, Tuple[str, List[str]]]:
+    return {key: (header, body) for key, header, body in iter_sections(lines) if key in keys}
+
+def _line_changes(before: List[str], after: List[str]) -> Tuple[List[str], List[str]]:
+    added, removed = [], []
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, before, after, autojunk=False).get_opcodes():
+        if op in ("replace", "delete"):
+            removed.extend(before[i1:i2])
+        if op in ("replace", "insert"):
+            added.extend(after[j1:j2])
+    return added, removed
+
+def diff_configs(open_before: Callable[[], Iterable[str]],
+                 open_after: Callable[[], Iterable[str]]) -> Dict:
+    """
+    Section-aware diff of two running-configs.
+
+    open_before/open_after return a fresh line iterator each call. A first
+    pass keeps only section keys and body digests; a second pass re-reads
+    just the sections that changed, so multi-MB configs are never held in
+    memory whole. Sections come out in config order.
+    """
+    before_order, before_digests = _section_digests(open_before())
+    after_order, after_digests = _section_digests(open_after())
+
+    plan = []   # (change, key)
+    for op, i1, i2, j1, j2 in SequenceMatcher(None, before_order, after_order, autojunk=False).get_opcodes():
+        if op == "equal":
+            plan.extend(("modified", k) for k in after_order[j1:j2] if before_digests[k] != after_digests[k])
+            continue
+        plan.extend(("removed", k) for k in before_order[i1:i2])
+        plan.extend(("added", k) for k in after_order[j1:j2])
+
+    wanted_before = {k for change, k in plan if change != "added"}
+    wanted_after = {k for change, k in plan if change != "removed"}
+    before_bodies = _collect(open_before(), wanted_before) if wanted_before else {}
+    after_bodies = _collect(open_after(), wanted_after) if wanted_after else {}
+
+    sections = []
+    lines_added = lines_removed = 0
+    for change, key in plan:
+        if change == "added":
+            header, body = after_bodies[key]
+            added, removed = [header] + body, []
+        elif change == "removed":
+            header, body = before_bodies[key]
+            added, removed = [], [header] + body
+        else:
+            header = after_bodies[key][0]
+            added, removed = _line_changes(before_bodies[key][1], after_bodies[key][1])
+        lines_added += len(added)
+        lines_removed += len(removed)
+        sections.append({"section": header, "change": change, "added": added, "removed": removed})
+
+    return {
+        "sections": sections,
+        "summary": {
+            "sectionsAdded": sum(1 for s in sections if s["change"] == "added"),
+            "sectionsRemoved": sum(1 for s in sections if s["change"] == "removed"),
+            "sectionsModified": sum(1 for s in sections if s["change"] == "modified"),
+            "linesAdded": lines_added,
+            "linesRemoved": lines_removed,
+        },
+    }
@@ -0,0 +1,129 @@
+# real-appli-back/utils/events.py
+from typing import Any, Dict, Iterable, List, Optional
+from collections import deque
+import itertools
+import json
+import os
+import threading
+import time
+
+TOPICS = ("alerts", "status", "health", "tickets")
+
+class Event:
+    """A published event; the SSE frame is encoded once and shared by all subscribers."""
+    __slots__ = ("id", "topic", "data", "frame")
+
+    def __init__(self, event_id: int, topic: str, data: Any, epoch: str = ""):
+        self.id = event_id
+        self.topic = topic
+        self.data = data
+        self.frame = f"id: {epoch}-{event_id}\nevent: {topic}\ndata: {json.dumps(data)}\n\n"
+
+class Subscription:
+    """
+    Bounded per-client queue. A slow client never blocks publishers: when the
+    queue is full the oldest event is dropped and the client is told to resync
+    (re-fetch the full payloads) before it receives newer deltas.
+    """
+
+    def __init__(self, topics: Iterable[str], max_queue: int):
+        self.topics = frozenset(topics)
+        self._queue: deque = deque(maxlen=max_queue)
+        self._cond = threading.Condition()
+        self.dropped = 0
+        self.needs_resync = False
+        self.closed = False
+
+    def put(self, event: Event) -> None:
+        with self._cond:
+            if len(self._queue) == self._queue.maxlen:
+                self.dropped += 1
+                self.needs_resync = True
+            self._queue.append(event)
+            self._cond.notify()
+
+    def get(self, timeout: float) -> List[Event]:
+        """Wait up to `timeout` seconds and drain whatever is queued."""
+        with self._cond:
+            if not self._queue and not self.closed and not self.needs_resync:
+                self._cond.wait(timeout)
+            events = list(self._queue)
+            self._queue.clear()
+            return events
+
+    def take_resync(self) -> bool:
+        with self._cond:
+            flag, self.needs_resync = self.needs_resync, False
+            return flag
+
+    def close(self) -> None:
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+class EventBus:
+    """
+    In-process fan-out of dashboard deltas to push subscribers.
+    Each event is serialized once at publish time; a short replay buffer lets
+    reconnecting clients (Last-Event-ID) catch up without a full resync.
+    Event IDs are "<epoch>-<seq>" with a per-process epoch, so an ID issued
+    before a restart is recognised as stale and answered with a resync.
+    """
+
+    def __init__(self, max_queue: int = 500, replay: int = 1000):
+        self.max_queue = max_queue
+        self.epoch = f"{int(time.time() * 1000):x}{os.getpid():x}"
+        self._lock = threading.Lock()
+        self._ids = itertools.count(1)
+        self._subscribers: List[Subscription] = []
+        self._replay: deque = deque(maxlen=replay)
+        self.published = 0
+
+    def publish(self, topic: str, data: Any) -> Optional[Event]:
+        with self._lock:
+            event = Event(next(self._ids), topic, data, self.epoch)
+            self._replay.append(event)
+            self.published += 1
+            targets = [s for s in self._subscribers if topic in s.topics]
+        for sub in targets:
+            sub.put(event)
+        return event
+
+    def _parse_id(self, last_event_id: str) -> Optional[int]:
+        """Sequence number of an ID from this process, else None."""
+        epoch, _, seq = last_event_id.rpartition("-")
+        if epoch != self.epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def subscribe(self, topics: Iterable[str] = TOPICS, last_event_id: Optional[str] = None) -> Subscription:
+        sub = Subscription(topics, self.max_queue)
+        with self._lock:
+            if last_event_id is not None:
+                seq = self._parse_id(last_event_id)
+                last = self._replay[-1].id if self._replay else 0
+                if seq is None or seq > last:
+                    sub.needs_resync = True   # from another epoch (restart) or never issued
+                else:
+                    oldest = self._replay[0].id if self._replay else None
+                    if oldest is not None and seq < oldest - 1:
+                        sub.needs_resync = True   # gap is older than the replay buffer
+                    for e in self._replay:
+                        if e.id > seq and e.topic in sub.topics:
+                            sub.put(e)
+            self._subscribers.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        sub.close()
+        with self._lock:
+            if sub in self._subscribers:
+                self._subscribers.remove(sub)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {
+                "subscribers": len(self._subscribers),
+                "published": self.published,
+                "dropped": sum(s.dropped for s in self._subscribers),
+            }
@@ -1,5 +1,5 @@
 # real-appli-back/utils/health.py
-from typing import List, Dict
+from typing import List, Dict, Optional
 import math
 
 def compute_device_health_score(device: Dict) -> int:
@@ -25,12 +25,15 @@ def compute_device_health_score(device: Dict) -> int:
     score = max(10, int(round(base - penalty)))
     return min(100, score)
 
-def compute_health_overview(devices: List[Dict]) -> Dict:
+def compute_health_overview(devices: List[Dict], scores: Optional[List[int]] = None) -> Dict:
     """
     Aggregate overview: averages grouped by layer / role
+    Pass precomputed per-device `scores` to avoid scoring every device again.
     """
+    if scores is None:
+        scores = [compute_device_health_score(d) for d in devices]
     groups = {}
-    for d in devices:
+    for d, score in zip(devices, scores):
         key = d.get("layer", "unknown")
         if key not in groups:
             groups[key] = {"count":0,"avgCpu":0,"avgMem":0,"avgHealth":0}
@@ -38,7 +41,7 @@ def compute_health_overview(devices: List[Dict]) -> Dict:
         g["count"] += 1
         g["avgCpu"] += d.get("cpuUsage",0)
         g["avgMem"] += d.get("memoryUsage",0)
-        g["avgHealth"] += compute_device_health_score(d)
+        g["avgHealth"] += score
     # finalize averages
     for k,v in groups.items():
         if v["count"]>0:
@@ -49,6 +52,6 @@ def compute_health_overview(devices: List[Dict]) -> Dict:
     overall = {
         "byLayer": groups,
         "totalDevices": len(devices),
-        "avgHealthAll": int(round(sum(compute_device_health_score(d) for d in devices)/len(devices)))
+        "avgHealthAll": int(round(sum(scores)/len(devices)))
     }
     return overall
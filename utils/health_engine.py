@@ -0,0 +1,88 @@
+# real-appli-back/utils/health_engine.py
+from typing import List, Dict, Tuple
+import numpy as np
+
+# Columns read from each device record and their defaults (same as utils/health.py)
+METRIC_DEFAULTS = {
+    "cpuUsage": 0,
+    "memoryUsage": 0,
+    "healthScore": 80,
+    "warnings": 0,
+    "criticalAlerts": 0,
+}
+
+def columns_from_devices(devices: List[Dict]) -> Dict[str, np.ndarray]:
+    """
+    Turn device dicts into float64 metric columns plus integer layer codes.
+    Layer labels are numbered in order of first appearance.
+    """
+    cols = {
+        name: np.fromiter((d.get(name, default) for d in devices), dtype=np.float64, count=len(devices))
+        for name, default in METRIC_DEFAULTS.items()
+    }
+    labels: Dict = {}
+    cols["layerCode"] = np.fromiter(
+        (labels.setdefault(d.get("layer", "unknown"), len(labels)) for d in devices),
+        dtype=np.int64, count=len(devices)
+    )
+    cols["layerLabels"] = list(labels)
+    return cols
+
+def score_arrays(cpu: np.ndarray, mem: np.ndarray, base: np.ndarray,
+                 warnings: np.ndarray, critical: np.ndarray) -> np.ndarray:
+    """
+    Vectorized compute_device_health_score: same penalties, same rounding
+    (round-half-even), same 10..100 clamp.
+    """
+    penalty = np.where(cpu > 80, (cpu - 80) * 0.6, np.where(cpu > 60, (cpu - 60) * 0.3, 0.0))
+    penalty = penalty + np.where(mem > 80, (mem - 80) * 0.4, 0.0)
+    penalty = penalty + (warnings * 1.5 + critical * 5)
+    score = np.maximum(10, np.rint(base - penalty).astype(np.int64))
+    return np.minimum(100, score)
+
+def grouped_overview(cpu: np.ndarray, mem: np.ndarray, scores: np.ndarray,
+                     layer_code: np.ndarray, layer_labels: List) -> Dict:
+    """
+    Vectorized compute_health_overview: per-layer averages via grouped reductions.
+    """
+    n_groups = len(layer_labels)
+    counts = np.bincount(layer_code, minlength=n_groups)
+    sum_cpu = np.bincount(layer_code, weights=cpu, minlength=n_groups)
+    sum_mem = np.bincount(layer_code, weights=mem, minlength=n_groups)
+    sum_health = np.bincount(layer_code, weights=scores, minlength=n_groups)
+
+    safe = np.maximum(counts, 1)
+    avg_cpu = np.rint(sum_cpu / safe).astype(np.int64)
+    avg_mem = np.rint(sum_mem / safe).astype(np.int64)
+    avg_health = np.rint(sum_health / safe).astype(np.int64)
+
+    groups = {}
+    for i, label in enumerate(layer_labels):
+        groups[label] = {
+            "count": int(counts[i]),
+            "avgCpu": int(avg_cpu[i]),
+            "avgMem": int(avg_mem[i]),
+            "avgHealth": int(avg_health[i]),
+        }
+
+    total = len(scores)
+    return {
+        "byLayer": groups,
+        "totalDevices": total,
+        "avgHealthAll": int(round(int(scores.sum()) / total)) if total else 0,
+    }
+
+def score_fleet(devices: List[Dict]) -> Tuple[List[int], Dict]:
+    """
+    Drop-in for scoring a whole fleet: returns (per-device scores, overview),
+    identical to compute_device_health_score / compute_health_overview.
+    """
+    cols = columns_from_devices(devices)
+    scores = score_arrays(
+        cols["cpuUsage"], cols["memoryUsage"], cols["healthScore"],
+        cols["warnings"], cols["criticalAlerts"]
+    )
+    overview = grouped_overview(
+        cols["cpuUsage"], cols["memoryUsage"], scores, cols["layerCode"], cols["layerLabels"]
+    )
+    return scores.tolist(), overview
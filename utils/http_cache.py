@@ -0,0 +1,78 @@
+# real-appli-back/utils/http_cache.py
+from typing import Any, Callable, Dict, Hashable, Optional
+from collections import OrderedDict
+import gzip
+import hashlib
+import threading
+
+try:
+    import brotli  # optional: enables Content-Encoding: br
+except ImportError:
+    brotli = None
+
+MIN_COMPRESS_SIZE = 1024   # smaller bodies are sent as-is
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def available_encodings():
+    return ("br", "gzip") if brotli else ("gzip",)
+
+class CachedBody:
+    """One serialized payload: raw bytes, content-hash ETag, compressed variants built lazily."""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self.etag = hashlib.sha256(body).hexdigest()[:32]
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None or len(self.body) < MIN_COMPRESS_SIZE:
+            return self.body
+        with self._lock:
+            data = self._encoded.get(encoding)
+            if data is None:
+                if encoding == "gzip":
+                    data = gzip.compress(self.body, compresslevel=GZIP_LEVEL, mtime=0)
+                elif encoding == "br" and brotli:
+                    data = brotli.compress(self.body, quality=BROTLI_QUALITY)
+                else:
+                    return self.body
+                self._encoded[encoding] = data
+            return data
+
+class ResponseCache:
+    """
+    Serialized responses keyed by name and data version.
+    Only the latest version of each key is kept: a request with a new version
+    rebuilds the body once and replaces the old entry. At most `max_entries`
+    keys are kept, least recently used first out.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max(1, max_entries)
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, version: Hashable, build: Callable[[], Any],
+            serialize: Callable[[Any], bytes]) -> CachedBody:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        cached = CachedBody(serialize(build()))
+        with self._lock:
+            self._entries[key] = (version, cached)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return cached
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,179 @@
+# real-appli-back/utils/insights_engine.py
+from typing import Dict, List
+from collections import Counter
+import threading
+
+HIGH_CPU = 70
+LOW_HEALTH = 80
+REPEATED_ALERTS = 2
+CATEGORIES = ("performance", "reliability", "compliance", "automation")
+
+class InsightsEngine:
+    """
+    Incremental version of utils.insights.generate_recommendations.
+
+    Keeps per-rule state (high-CPU and low-health device sets, alert counts
+    per device, non-compliant devices, failed task count) and updates it from
+    data changes and live automation runs; only rules whose inputs changed are
+    re-rendered. For the data files alone, output is identical to
+    generate_recommendations, including list order.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        # devices
+        self._devices: Dict[str, tuple] = {}       # id -> (name, cpuUsage, healthScore)
+        self._device_pos: Dict[str, int] = {}
+        self._high_cpu: set = set()
+        self._low_health: set = set()
+        # alerts
+        self._alerts: Dict[str, str] = {}          # alert id -> deviceId
+        self._alert_counts: Counter = Counter()
+        self._first_alert: Dict[str, int] = {}     # deviceId -> position of its first alert
+        # compliance / automation
+        self._non_compliant: List[str] = []
+        self._tasks: Dict[str, str] = {}           # taskId -> status (automation.json and live runs)
+        self._file_tasks: set = set()              # taskIds currently in automation.json
+        self._untracked_failed = 0                 # failed automation.json tasks without a taskId
+        self._failed_tasks = 0
+
+        self._rendered: Dict[str, List[str]] = {}
+        self._dirty = set(CATEGORIES)
+
+    # ---- devices ----
+    def sync_devices(self, devices: List[Dict]) -> None:
+        with self._lock:
+            incoming = {d["id"]: (d.get("name"), d.get("cpuUsage", 0), d.get("healthScore", 100)) for d in devices}
+            for did in [did for did in self._devices if did not in incoming]:
+                self._drop_device(did)
+            for did, row in incoming.items():
+                if self._devices.get(did) != row:
+                    self._set_device(did, row)
+            positions = {d["id"]: i for i, d in enumerate(devices)}
+            if positions != self._device_pos:
+                self._device_pos = positions
+                self._dirty.update(("performance", "reliability"))
+
+    def _set_device(self, did: str, row: tuple) -> None:
+        self._devices[did] = row
+        for members, hit in ((self._high_cpu, row[1] >= HIGH_CPU),
+                             (self._low_health, row[2] < LOW_HEALTH)):
+            if hit:
+                members.add(did)
+            else:
+                members.discard(did)
+        self._dirty.update(("performance", "reliability"))
+
+    def _drop_device(self, did: str) -> None:
+        del self._devices[did]
+        self._high_cpu.discard(did)
+        self._low_health.discard(did)
+        self._dirty.update(("performance", "reliability"))
+
+    # ---- alerts ----
+    def sync_alerts(self, alerts: List[Dict]) -> None:
+        with self._lock:
+            incoming = {a["id"]: a["deviceId"] for a in alerts}
+            changed = False
+            for aid in [aid for aid in self._alerts if aid not in incoming]:
+                self._alert_counts[self._alerts.pop(aid)] -= 1
+                changed = True
+            for aid, device in incoming.items():
+                old = self._alerts.get(aid)
+                if old != device:
+                    if old is not None:
+                        self._alert_counts[old] -= 1
+                    self._alerts[aid] = device
+                    self._alert_counts[device] += 1
+                    changed = True
+            if changed:
+                self._alert_counts = +self._alert_counts   # drop zero counts
+
+            first = {}
+            for i, a in enumerate(alerts):
+                first.setdefault(a["deviceId"], i)
+            if changed or first != self._first_alert:
+                self._first_alert = first
+                self._dirty.add("reliability")
+
+    # ---- compliance ----
+    def sync_compliance(self, compliance_data: Dict) -> None:
+        with self._lock:
+            # same field as evaluate_simple_compliance_summary
+            non_compliant = [r["deviceId"] for r in compliance_data.get("results", []) if r.get("failedRules")]
+            if non_compliant != self._non_compliant:
+                self._non_compliant = non_compliant
+                self._dirty.add("compliance")
+
+    # ---- automation ----
+    def sync_automation(self, tasks: List[Dict]) -> None:
+        """Mirror automation.json; live runs fed through add_task are kept."""
+        with self._lock:
+            incoming, untracked = {}, 0
+            for t in tasks:
+                if t.get("taskId"):
+                    incoming[t["taskId"]] = t["status"]
+                else:
+                    untracked += t["status"] != "success"
+            for tid in self._file_tasks - incoming.keys():
+                self._set_task(tid, None)
+            for tid, status in incoming.items():
+                self._set_task(tid, status)
+            self._file_tasks = set(incoming)
+            self._count_failed(untracked - self._untracked_failed)
+            self._untracked_failed = untracked
+
+    def add_task(self, task: Dict) -> None:
+        """Record one finished automation run (a known taskId replaces its earlier status)."""
+        with self._lock:
+            self._set_task(task["taskId"], task["status"])
+
+    def _set_task(self, tid: str, status) -> None:
+        old = self._tasks.pop(tid, None)
+        if status is not None:
+            self._tasks[tid] = status
+        self._count_failed((status is not None and status != "success") - (old is not None and old != "success"))
+
+    def _count_failed(self, delta: int) -> None:
+        if delta:
+            self._failed_tasks += delta
+            self._dirty.add("automation")
+
+    # ---- output ----
+    def _render(self, category: str) -> List[str]:
+        if category == "performance":
+            high_cpu = sorted(self._high_cpu, key=self._device_pos.get)
+            if high_cpu:
+                names = ", ".join(self._devices[d][0] for d in high_cpu)
+                return [f"High CPU devices: {names}. Consider traffic shaping or capacity review."]
+            return ["No devices currently with sustained high CPU."]
+
+        if category == "reliability":
+            out = []
+            low = sorted(self._low_health, key=self._device_pos.get)
+            if low:
+                names = ", ".join(self._devices[d][0] for d in low)
+                out.append(f"Devices with health < 80: {names}. Investigate warnings/alerts.")
+            else:
+                out.append("All devices maintain acceptable health scores.")
+            repeated = sorted((d for d, c in self._alert_counts.items() if c >= REPEATED_ALERTS),
+                              key=self._first_alert.get)
+            if repeated:
+                out.append(f"Devices with repeated alerts: {', '.join(repeated)}. Root cause investigation recommended.")
+            return out
+
+        if category == "compliance":
+            if self._non_compliant:
+                return [f"Non-compliant devices: {', '.join(self._non_compliant)}. Schedule remediation."]
+            return ["All devices compliant with baseline rules."]
+
+        if self._failed_tasks:
+            return [f"{self._failed_tasks} failed automation tasks. Attach logs and auto-open incidents for failed runs."]
+        return ["All recent automation tasks succeeded."]
+
+    def recommendations(self) -> Dict[str, List[str]]:
+        with self._lock:
+            for category in self._dirty:
+                self._rendered[category] = self._render(category)
+            self._dirty.clear()
+            return {c: list(self._rendered[c]) for c in CATEGORIES}
@@ -0,0 +1,47 @@
+# real-appli-back/utils/sqlite_store.py
+from typing import Iterator, Tuple
+from contextlib import contextmanager
+import sqlite3
+import threading
+
+class SQLiteStore:
+    """
+    Base for the SQLite-backed stores: one WAL-mode connection per thread
+    (SQLite serialises writers across them) and BEGIN IMMEDIATE write
+    transactions that roll back on any error, including a failed COMMIT.
+    """
+
+    pragmas: Tuple[str, ...] = ()        # extra per-connection PRAGMAs
+    row_factory = None
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for pragma in self.pragmas:
+                conn.execute(f"PRAGMA {pragma}")
+            self._local.conn = conn
+        return conn
+
+    def _before_commit(self, conn: sqlite3.Connection) -> None:
+        """Hook run as the last statement of every write transaction."""
+
+    @contextmanager
+    def _write(self) -> Iterator[sqlite3.Connection]:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            self._before_commit(conn)
+            conn.execute("COMMIT")
+        except BaseException:
+            if conn.in_transaction:   # also when COMMIT itself failed
+                conn.execute("ROLLBACK")
+            raise
@@ -0,0 +1,180 @@
+# real-appli-back/utils/timeseries.py
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime, timezone
+import re
+import threading
+import time
+
+# Rollup resolutions (seconds), finest first
+RESOLUTIONS = {"1m": 60, "1h": 3600, "1d": 86400}
+
+# How long each resolution is kept (seconds)
+DEFAULT_RETENTION = {
+    "1m": 2 * 86400,
+    "1h": 90 * 86400,
+    "1d": 5 * 365 * 86400,
+}
+RAW_POINTS = 10000  # raw ring buffer size per series
+
+AGGREGATES = ("avg", "sum", "min", "max", "last", "count")
+
+_DURATION = re.compile(r"^(\d+)([smhdw]?)$")
+_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+def parse_duration(value: str, default_unit: str = "d") -> int:
+    """'7' (days), '7d', '24h', '90m', '3600s', '2w' -> seconds."""
+    m = _DURATION.match(str(value).strip().lower())
+    if not m or int(m.group(1)) <= 0:
+        raise ValueError(f"Invalid duration: {value}")
+    return int(m.group(1)) * _UNITS[m.group(2) or default_unit]
+
+def parse_timestamp(value) -> float:
+    """Epoch seconds from a number or an ISO date/datetime (UTC if no zone)."""
+    if isinstance(value, (int, float)):
+        return float(value)
+    dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt.timestamp()
+
+class _Rollup:
+    """Buckets of [count, sum, min, max, last, last_ts] keyed by bucket start, kept sorted."""
+
+    def __init__(self, width: int, retention: int):
+        self.width = width
+        self.retention = retention
+        self.starts: List[int] = []
+        self.buckets: Dict[int, list] = {}
+
+    def add(self, ts: float, value: float) -> None:
+        start = int(ts // self.width) * self.width
+        b = self.buckets.get(start)
+        if b is None:
+            self.buckets[start] = [1, value, value, value, value, ts]
+            insort(self.starts, start)
+        else:
+            b[0] += 1
+            b[1] += value
+            b[2] = min(b[2], value)
+            b[3] = max(b[3], value)
+            if ts >= b[5]:
+                b[4], b[5] = value, ts
+        # retention relative to the newest bucket
+        cutoff = self.starts[-1] - self.retention
+        drop = bisect_left(self.starts, cutoff)
+        if drop:
+            for s in self.starts[:drop]:
+                del self.buckets[s]
+            del self.starts[:drop]
+
+    def range(self, start: float, end: float):
+        lo = bisect_left(self.starts, int(start // self.width) * self.width)
+        hi = bisect_right(self.starts, end)
+        for s in self.starts[lo:hi]:
+            yield s, self.buckets[s]
+
+class _Series:
+    def __init__(self, retention: Dict[str, int], raw_points: int):
+        self.raw = deque(maxlen=raw_points)  # (ts, value) ring buffer
+        self.rollups = {name: _Rollup(RESOLUTIONS[name], retention[name]) for name in RESOLUTIONS}
+
+    def add(self, ts: float, value: float) -> None:
+        self.raw.append((ts, value))
+        for r in self.rollups.values():
+            r.add(ts, value)
+
+class MetricStore:
+    """
+    Append-only time-series store for device/fleet metrics.
+    Every point is folded into 1m/1h/1d rollups on write, so range queries
+    read a handful of pre-aggregated buckets instead of scanning raw points.
+    """
+
+    def __init__(self, retention: Optional[Dict[str, int]] = None, raw_points: int = RAW_POINTS):
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
+        self.raw_points = raw_points
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self._lock = threading.Lock()
+
+    def append(self, metric: str, value: float, ts: Optional[float] = None, series: str = "fleet") -> None:
+        if value is None:
+            return
+        ts = time.time() if ts is None else float(ts)
+        with self._lock:
+            s = self._series.get((metric, series))
+            if s is None:
+                s = self._series[(metric, series)] = _Series(self.retention, self.raw_points)
+            s.add(ts, float(value))
+
+    def metrics(self) -> Dict[str, List[str]]:
+        with self._lock:
+            out: Dict[str, List[str]] = {}
+            for metric, series in self._series:
+                out.setdefault(metric, []).append(series)
+            return out
+
+    def query(self, metric: str, start: float, end: float, step: int,
+              series: str = "fleet", agg: str = "avg") -> List[Tuple[int, float]]:
+        """
+        Values of `metric` in [start, end] grouped into `step`-second buckets.
+        Served from the coarsest rollup that divides the step; raw points are
+        only used for sub-minute steps.
+        """
+        if agg not in AGGREGATES:
+            raise ValueError(f"agg must be one of {', '.join(AGGREGATES)}")
+        with self._lock:
+            s = self._series.get((metric, series))
+            if s is None:
+                return []
+            rollup = None
+            for name in reversed(list(RESOLUTIONS)):
+                width = RESOLUTIONS[name]
+                if step >= width and step % width == 0:
+                    rollup = s.rollups[name]
+                    break
+            if rollup is not None:
+                source = [(b_start, b[:]) for b_start, b in rollup.range(start, end)]
+            else:
+                source = [(ts, [1, v, v, v, v, ts]) for ts, v in s.raw if start <= ts <= end]
+
+        out: Dict[int, list] = {}
+        for ts, b in source:
+            key = int(ts // step) * step
+            acc = out.get(key)
+            if acc is None:
+                out[key] = b
+            else:
+                acc[0] += b[0]
+                acc[1] += b[1]
+                acc[2] = min(acc[2], b[2])
+                acc[3] = max(acc[3], b[3])
+                if b[5] >= acc[5]:
+                    acc[4], acc[5] = b[4], b[5]
+
+        result = []
+        for key in sorted(out):
+            count, total, lo, hi, last, _ = out[key]
+            value = {
+                "avg": total / count, "sum": total, "min": lo,
+                "max": hi, "last": last, "count": count,
+            }[agg]
+            result.append((key, value))
+        return result
+
+    def query_table(self, metrics: List[str], start: float, end: float, step: int,
+                    series: str = "fleet", agg: str = "avg") -> List[Dict]:
+        """Several metrics pivoted into rows keyed by bucket, shaped like trends.json."""
+        rows: Dict[int, Dict] = {}
+        for metric in metrics:
+            for ts, value in self.query(metric, start, end, step, series, agg):
+                row = rows.setdefault(ts, {"date": _label(ts, step)})
+                row[metric] = round(value, 2)
+        return [rows[ts] for ts in sorted(rows)]
+
+def _label(ts: int, step: int) -> str:
+    dt = datetime.fromtimestamp(ts, tz=timezone.utc)
+    if step % 86400 == 0:
+        return dt.strftime("%Y-%m-%d")
+    return dt.strftime("%Y-%m-%dT%H:%M:%SZ")
@@ -0,0 +1,258 @@
+# real-appli-back/utils/topology.py
+from typing import Dict, Iterable, List, Optional, Set
+from collections import deque
+import threading
+
+ROOT_LAYERS = ("core",)
+
+def discovery_links(inventory: List[Dict]) -> List[Dict]:
+    """
+    Links implied by discovery CDP neighbors. Neighbors are reported as FQDNs
+    (R2.network.local); they are matched to inventory hostnames case-insensitively.
+    """
+    known = {(d.get("hostname") or "").lower(): d["hostname"] for d in inventory if d.get("hostname")}
+    links, seen = [], set()
+    for d in inventory:
+        a = d.get("hostname")
+        if not a:
+            continue
+        for nb in d.get("neighbors") or []:
+            short = nb.split(".")[0]
+            b = known.get(short.lower(), short)
+            pair = tuple(sorted((a, b)))
+            if a == b or pair in seen:
+                continue
+            seen.add(pair)
+            links.append({"id": f"cdp:{pair[0]}|{pair[1]}", "source": pair[0], "target": pair[1],
+                          "origin": "discovery"})
+    return links
+
+class TopologyGraph:
+    """
+    Adjacency-indexed, undirected topology graph.
+    Nodes are device records keyed by id; endpoints that are not known devices
+    (e.g. tap0) become bare {"id": ...} nodes. Links are kept by id and
+    indexed per node pair, and `sync` applies only what changed, so queries
+    never rebuild the graph. `version` increases on every change.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.nodes: Dict[str, Dict] = {}
+        self.links: Dict = {}
+        self.adj: Dict[str, Dict[str, Set]] = {}   # node -> neighbor -> link ids
+        self._implicit: Set[str] = set()           # nodes created only as link endpoints
+        self.version = 0
+
+    # ---- mutation ----
+    def _ensure_node(self, node_id: str) -> None:
+        if node_id not in self.nodes:
+            self.nodes[node_id] = {"id": node_id}
+            self._implicit.add(node_id)
+        self.adj.setdefault(node_id, {})
+
+    def upsert_node(self, node: Dict) -> None:
+        with self._lock:
+            if self.nodes.get(node["id"]) == node and node["id"] not in self._implicit:
+                return
+            self.nodes[node["id"]] = node
+            self._implicit.discard(node["id"])
+            self.adj.setdefault(node["id"], {})
+            self.version += 1
+
+    def remove_node(self, node_id: str) -> None:
+        """Drop a device; it stays as a bare endpoint while links still reference it."""
+        with self._lock:
+            if node_id not in self.nodes:
+                return
+            if self.adj.get(node_id):
+                self.nodes[node_id] = {"id": node_id}
+                self._implicit.add(node_id)
+            else:
+                self._drop_node(node_id)
+            self.version += 1
+
+    def _drop_node(self, node_id: str) -> None:
+        self.nodes.pop(node_id, None)
+        self.adj.pop(node_id, None)
+        self._implicit.discard(node_id)
+
+    def add_link(self, link: Dict) -> None:
+        with self._lock:
+            old = self.links.get(link["id"])
+            if old == link:
+                return
+            if old is not None:
+                self._unlink(old)
+            a, b = link["source"], link["target"]
+            self._ensure_node(a)
+            self._ensure_node(b)
+            self.links[link["id"]] = link
+            self.adj[a].setdefault(b, set()).add(link["id"])
+            self.adj[b].setdefault(a, set()).add(link["id"])
+            self.version += 1
+
+    def remove_link(self, link_id) -> None:
+        with self._lock:
+            link = self.links.get(link_id)
+            if link is not None:
+                self._unlink(link)
+                self.version += 1
+
+    def _unlink(self, link: Dict) -> None:
+        a, b = link["source"], link["target"]
+        del self.links[link["id"]]
+        for x, y in ((a, b), (b, a)):
+            ids = self.adj[x][y]
+            ids.discard(link["id"])
+            if not ids:
+                del self.adj[x][y]
+            if x in self._implicit and not self.adj[x]:
+                self._drop_node(x)
+
+    def sync(self, devices: Iterable[Dict], links: Iterable[Dict]) -> Dict[str, int]:
+        """Bring the graph in line with full device/link lists, touching only the differences."""
+        devices = {d["id"]: d for d in devices}
+        links = {l["id"]: l for l in links}
+        # discovery links are skipped where a documented link already joins the pair
+        pairs = {frozenset((l["source"], l["target"])) for l in links.values() if l.get("origin") != "discovery"}
+        links = {k: l for k, l in links.items()
+                 if l.get("origin") != "discovery" or frozenset((l["source"], l["target"])) not in pairs}
+
+        with self._lock:
+            start = self.version
+            for lid in [lid for lid in self.links if lid not in links]:
+                self.remove_link(lid)
+            for node_id in [n for n in self.nodes if n not in devices and n not in self._implicit]:
+                self.remove_node(node_id)
+            for d in devices.values():
+                self.upsert_node(d)
+            for l in links.values():
+                self.add_link(l)
+            return {"version": self.version, "changes": self.version - start}
+
+    # ---- queries ----
+    def neighbors(self, node_id: str) -> List[str]:
+        return list(self.adj.get(node_id, {}))
+
+    def shortest_path(self, src: str, dst: str) -> Optional[Dict]:
+        """Fewest-hops path (BFS) as {"nodes": [...], "links": [...]}, or None."""
+        with self._lock:
+            if src not in self.adj or dst not in self.adj:
+                return None
+            parent = {src: None}
+            queue = deque([src])
+            while queue and dst not in parent:
+                node = queue.popleft()
+                for nb in self.adj[node]:
+                    if nb not in parent:
+                        parent[nb] = node
+                        queue.append(nb)
+            if dst not in parent:
+                return None
+            nodes = [dst]
+            while parent[nodes[-1]] is not None:
+                nodes.append(parent[nodes[-1]])
+            nodes.reverse()
+            links = [self.links[min(self.adj[a][b], key=str)] for a, b in zip(nodes, nodes[1:])]
+            return {"nodes": nodes, "links": links}
+
+    def _reachable(self, starts: Iterable[str], blocked: Set[str]) -> Set[str]:
+        seen = {s for s in starts if s in self.adj and s not in blocked}
+        queue = deque(seen)
+        while queue:
+            node = queue.popleft()
+            for nb in self.adj[node]:
+                if nb not in seen and nb not in blocked:
+                    seen.add(nb)
+                    queue.append(nb)
+        return seen
+
+    def roots(self) -> List[str]:
+        return [n for n, d in self.nodes.items() if d.get("layer") in ROOT_LAYERS]
+
+    def impact(self, node_id: str, roots: Optional[List[str]] = None) -> Optional[Dict]:
+        """
+        Blast radius of a node failure: nodes in its component that can no
+        longer reach any root (core devices by default) once it is gone.
+        """
+        with self._lock:
+            if node_id not in self.adj:
+                return None
+            roots = [r for r in (roots or self.roots()) if r in self.adj]
+            component = self._reachable([node_id], set())
+            still_up = self._reachable([r for r in roots if r != node_id], {node_id})
+            impacted = sorted(component - still_up - {node_id})
+            return {"node": node_id, "roots": roots, "impacted": impacted}
+
+    def components(self) -> List[List[str]]:
+        """Connected components, largest first."""
+        with self._lock:
+            seen: Set[str] = set()
+            out = []
+            for node in self.adj:
+                if node not in seen:
+                    comp = self._reachable([node], set())
+                    seen |= comp
+                    out.append(sorted(comp))
+            out.sort(key=len, reverse=True)
+            return out
+
+    def subgraph(self, node_ids: Iterable[str]) -> Dict[str, List[Dict]]:
+        """Nodes plus the links among them."""
+        with self._lock:
+            ids = [n for n in node_ids if n in self.nodes]
+            keep = set(ids)
+            links = {lid for n in ids for nb, lids in self.adj[n].items() if nb in keep for lid in lids}
+            return {"devices": [self.nodes[n] for n in ids],
+                    "links": [self.links[lid] for lid in sorted(links, key=str)]}
+
+    def neighborhood(self, node_id: str, depth: int = 1) -> List[str]:
+        with self._lock:
+            if node_id not in self.adj:
+                return []
+            seen = {node_id: 0}
+            queue = deque([node_id])
+            while queue:
+                node = queue.popleft()
+                if seen[node] == depth:
+                    continue
+                for nb in self.adj[node]:
+                    if nb not in seen:
+                        seen[nb] = seen[node] + 1
+                        queue.append(nb)
+            return list(seen)
+
+    def page(self, page: int, page_size: int, node_ids: Optional[List[str]] = None) -> Dict:
+        """
+        One page of nodes (in id order) with the links whose first endpoint,
+        in that order, is on this page, so links are never sent twice. With
+        node_ids, only those nodes and the links among them are paged.
+        """
+        with self._lock:
+            ordered = sorted(self.nodes if node_ids is None else node_ids, key=str)
+            index = {n: i for i, n in enumerate(ordered)}
+            chunk = ordered[page * page_size:(page + 1) * page_size]
+            links = []
+            for n in chunk:
+                for nb, lids in self.adj[n].items():
+                    if index.get(nb, -1) > index[n]:
+                        links.extend(self.links[lid] for lid in sorted(lids, key=str))
+            return {
+                "devices": [self.nodes[n] for n in chunk],
+                "links": links,
+                "page": page,
+                "pageSize": page_size,
+                "totalNodes": len(ordered),
+                "nextPage": page + 1 if (page + 1) * page_size < len(ordered) else None,
+            }
+
+    def export(self) -> Dict:
+        """All nodes and links, copied under the lock (consistent with `version`)."""
+        with self._lock:
+            return {"version": self.version, "nodes": list(self.nodes.values()),
+                    "links": list(self.links.values())}
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"nodes": len(self.nodes), "links": len(self.links), "version": self.version}
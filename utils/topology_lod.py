@@ -0,0 +1,164 @@
+# real-appli-back/utils/topology_lod.py
+from typing import Dict, Iterator, List, Optional, Tuple
+import threading
+
+from utils.topology import TopologyGraph
+
+LOD_MODES = ("layer", "site")
+LAYER_RANK = {"core": 0, "distribution": 1, "access": 2}
+X_SPACING = 120
+Y_SPACING = 160
+
+def _rank(node: Dict) -> int:
+    return LAYER_RANK.get(node.get("layer"), len(LAYER_RANK))
+
+def layered_layout(nodes: List[Dict], edges: List[Dict]) -> Dict[str, Tuple[int, int]]:
+    """
+    Deterministic layered layout: one row per layer (core on top), nodes in a
+    row ordered by the mean x of their neighbours in the rows above.
+    """
+    rows: Dict[int, List[Dict]] = {}
+    for n in nodes:
+        rows.setdefault(n.get("rank", _rank(n)), []).append(n)
+    adj: Dict[str, List[str]] = {}
+    for e in edges:
+        adj.setdefault(e["source"], []).append(e["target"])
+        adj.setdefault(e["target"], []).append(e["source"])
+
+    pos: Dict[str, Tuple[int, int]] = {}
+    for y, rank in enumerate(sorted(rows)):
+        def barycenter(n):
+            xs = [pos[m][0] for m in adj.get(n["id"], []) if m in pos]
+            return (sum(xs) / len(xs) if xs else float("inf"), str(n["id"]))
+        row = sorted(rows[rank], key=barycenter)
+        offset = (len(row) - 1) * X_SPACING / 2
+        for i, n in enumerate(row):
+            pos[n["id"]] = (round(i * X_SPACING - offset), y * Y_SPACING)
+    return pos
+
+class TopologyLOD:
+    """
+    Level-of-detail views of a TopologyGraph.
+
+    lod="layer" collapses nodes of the `collapse` layers (access by default)
+    into one cluster per layer and set of upstream neighbours, e.g. all access
+    switches hanging off SW-A; lod="site" collapses every site into a cluster.
+    Links between clusters are merged into weighted edges. Views, cluster
+    membership and the layout are computed once per graph version.
+    """
+
+    def __init__(self, graph: TopologyGraph):
+        self.graph = graph
+        self._lock = threading.Lock()
+        self._views: Dict[Tuple, Tuple[int, Dict, Dict[str, str]]] = {}
+
+    def view(self, by: str = "layer", collapse: Tuple[str, ...] = ("access",)) -> Dict:
+        return self._view(by, collapse)[0]
+
+    def _view(self, by: str, collapse: Tuple[str, ...]) -> Tuple[Dict, Dict[str, str]]:
+        if by not in LOD_MODES:
+            raise ValueError(f"lod must be one of {', '.join(LOD_MODES)}")
+        key = (by, tuple(sorted(collapse)) if by == "layer" else ())
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is not None and cached[0] == self.graph.version:
+                return cached[1], cached[2]
+        with self.graph._lock:
+            version = self.graph.version
+            view, rep = self._build(by, set(key[1]))
+        with self._lock:
+            self._views[key] = (version, view, rep)
+        return view, rep
+
+    def _cluster_of(self, node_id: str, by: str, collapse: set) -> Optional[str]:
+        node = self.graph.nodes[node_id]
+        if by == "site":
+            return f"cluster:site:{node.get('site') or 'unknown'}"
+        if node.get("layer") not in collapse:
+            return None
+        upstream = sorted(
+            str(nb) for nb in self.graph.adj[node_id]
+            if self.graph.nodes[nb].get("layer") not in collapse
+        )
+        return f"cluster:{node['layer']}:{'+'.join(upstream) or 'isolated'}"
+
+    def _build(self, by: str, collapse: set) -> Tuple[Dict, Dict[str, str]]:
+        g = self.graph
+        rep: Dict[str, str] = {}                 # node id -> id drawn on the map
+        clusters: Dict[str, List[str]] = {}
+        for node_id in g.nodes:
+            cluster = self._cluster_of(node_id, by, collapse)
+            rep[node_id] = cluster or node_id
+            if cluster:
+                clusters.setdefault(cluster, []).append(node_id)
+
+        nodes = []
+        for node_id, node in g.nodes.items():
+            if rep[node_id] == node_id:
+                nodes.append({**node, "rank": _rank(node)})
+        for cluster, members in clusters.items():
+            first = g.nodes[members[0]]
+            nodes.append({
+                "id": cluster,
+                "type": "cluster",
+                "label": cluster.split(":", 2)[2] if by == "site" else f"{first.get('layer')} ({len(members)})",
+                "layer": first.get("layer") if by == "layer" else None,
+                "site": first.get("site") if by == "site" else None,
+                "size": len(members),
+                "rank": min(_rank(g.nodes[m]) for m in members),
+            })
+
+        weights: Dict[Tuple[str, str], int] = {}
+        for link in g.links.values():
+            a, b = rep[link["source"]], rep[link["target"]]
+            if a != b:
+                pair = (a, b) if str(a) <= str(b) else (b, a)
+                weights[pair] = weights.get(pair, 0) + 1
+        edges = [{"id": f"{a}~{b}", "source": a, "target": b, "count": c} for (a, b), c in weights.items()]
+
+        pos = layered_layout(nodes, edges)
+        for n in nodes:
+            n["x"], n["y"] = pos[n["id"]]
+        view = {
+            "lod": by,
+            "version": g.version,
+            "nodes": nodes,
+            "edges": edges,
+            "clusters": {c: sorted(m, key=str) for c, m in clusters.items()},
+        }
+        return view, rep
+
+    def expand(self, cluster_id: str, by: str = "layer", collapse: Tuple[str, ...] = ("access",)) -> Optional[Dict]:
+        """Member nodes of a cluster (placed under it) and their links, with outside ends mapped to the view."""
+        view, rep = self._view(by, collapse)
+        members = view["clusters"].get(cluster_id)
+        if members is None:
+            return None
+        anchor = next(n for n in view["nodes"] if n["id"] == cluster_id)
+        member_set = set(members)
+
+        with self.graph._lock:
+            nodes = []
+            offset = (len(members) - 1) * X_SPACING / 2
+            for i, m in enumerate(members):
+                nodes.append({**self.graph.nodes[m], "cluster": cluster_id,
+                              "x": round(anchor["x"] + i * X_SPACING - offset), "y": anchor["y"] + Y_SPACING // 2})
+            edges = []
+            for m in members:
+                for nb, lids in self.graph.adj[m].items():
+                    if nb in member_set and str(nb) < str(m):
+                        continue
+                    target = nb if nb in member_set else rep.get(nb, nb)
+                    for lid in sorted(lids, key=str):
+                        edges.append({**self.graph.links[lid], "source": m, "target": target})
+        return {"cluster": cluster_id, "version": view["version"], "nodes": nodes, "edges": edges}
+
+def iter_chunks(view: Dict, chunk_size: int) -> Iterator[Dict]:
+    """Split a view into NDJSON records: meta, node chunks, edge chunks, end."""
+    yield {"type": "meta", "lod": view.get("lod"), "version": view["version"],
+           "nodes": len(view["nodes"]), "edges": len(view["edges"])}
+    for kind in ("nodes", "edges"):
+        items = view[kind]
+        for i in range(0, len(items), chunk_size):
+            yield {"type": kind, "items": items[i:i + chunk_size]}
+    yield {"type": "end"}